@@ -136,6 +136,10 @@ DEFAULT_CONFIG = """
     # we can turn off deposit receipts, which is allowed by the specification
     "return_deposit_receipt" : true,
 
+    # lay out the stored Statements with indentation, which is easier to read when debugging but slower to produce
+    # and larger to send
+    "pretty_print" : false,
+
     # The acceptable formats that the server can return the media resource in
     # on request.
     # This is used in Content Negotiation during GET on the EM-URI
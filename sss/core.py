@@ -1,6 +1,7 @@
 import web, os, base64, uuid, StringIO
 from lxml import etree
 from datetime import datetime
+from collections import OrderedDict
 from spec import Namespaces, HttpHeaders, Errors
 from info import __version__
 
@@ -293,7 +294,7 @@ class EntryDocument(object):
 
         # Date last updated
         updated = etree.SubElement(entry, self.ns.ATOM + "updated")
-        updated.text = self.updated.strftime("%Y-%m-%dT%H:%M:%SZ")
+        updated.text = _timestamp(self.updated)
 
         # Author field from metadata
         author = etree.SubElement(entry, self.ns.ATOM + "author")
@@ -533,7 +534,7 @@ class SwordError(Exception):
 
         # Date last updated (i.e. NOW)
         updated = etree.SubElement(entry, self.ns.ATOM + "updated")
-        updated.text = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
+        updated.text = _timestamp(datetime.now())
 
         # Generator - identifier for this server software
         generator = etree.SubElement(entry, self.ns.ATOM + "generator")
@@ -570,10 +571,42 @@ class Auth(object):
         self.username = username
         self.on_behalf_of = on_behalf_of
 
+def _timestamp(d):
+    """
+    Format the supplied datetime as YYYY-MM-DDTHH:MM:SSZ.  This is the only date format we ever write, so build it
+    directly rather than going through strftime
+    """
+    return "%04d-%02d-%02dT%02d:%02d:%02dZ" % (d.year, d.month, d.day, d.hour, d.minute, d.second)
+
+def _is_true(value):
+    return value.strip() == "true"
+
 class SWORDRequest(object):
     """
     General class to represent any sword request (such as deposit or delete)
     """
+    # the attribute that each of the headers we understand is stored in, along with the function which converts the
+    # header value for it (None if the value is stored as it is).  The first is keyed by the HttpHeaders names, and
+    # the second by the web.py environment names
+    header_attributes = {
+        HttpHeaders.on_behalf_of : ("on_behalf_of", None),
+        HttpHeaders.packaging : ("packaging", None),
+        HttpHeaders.in_progress : ("in_progress", _is_true),
+        HttpHeaders.metadata_relevant : ("metadata_relevant", _is_true),
+        HttpHeaders.content_md5 : ("content_md5", None),
+        HttpHeaders.slug : ("slug", None),
+        HttpHeaders.content_type : ("content_type", None),
+        HttpHeaders.content_length : ("content_length", int)
+    }
+    webpy_header_attributes = {
+        "HTTP_ON_BEHALF_OF" : ("on_behalf_of", None),
+        "HTTP_PACKAGING" : ("packaging", None),
+        "HTTP_IN_PROGRESS" : ("in_progress", _is_true),
+        "HTTP_METADATA_RELEVANT" : ("metadata_relevant", _is_true),
+        "HTTP_CONTENT_MD5" : ("content_md5", None),
+        "HTTP_SLUG" : ("slug", None)
+    }
+
     def __init__(self):
         """
         There are 4 HTTP sourced properties:
@@ -594,24 +627,14 @@ class SWORDRequest(object):
         self.content_length = 0
 
     def set_from_headers(self, headers):
-        for key, value in headers.items():
-            if value is not None:
-                if key == HttpHeaders.on_behalf_of:
-                    self.on_behalf_of = value
-                elif key == HttpHeaders.packaging:
-                    self.packaging = value
-                elif key == HttpHeaders.in_progress:
-                    self.in_progress = (value.strip() == "true")
-                elif key == HttpHeaders.metadata_relevant:
-                    self.metadata_relevant = (value.strip() == "true")
-                elif key == HttpHeaders.content_md5:
-                    self.content_md5 = value
-                elif key == HttpHeaders.slug:
-                    self.slug = value
-                elif key == HttpHeaders.content_type:
-                    self.content_type = value
-                elif key == HttpHeaders.content_length:
-                    self.content_length = int(value)
+        header_attributes = self.header_attributes
+        for key, value in headers.iteritems():
+            if value is None:
+                continue
+            attribute = header_attributes.get(key)
+            if attribute is not None:
+                name, convert = attribute
+                setattr(self, name, value if convert is None else convert(value))
 
     def set_by_header(self, key, value):
         # FIXME: this is a webpy thing....
@@ -622,18 +645,11 @@ class SWORDRequest(object):
         (for some unknown reason)
         """
         ssslog.debug("Setting Header %s : %s" % (key, value))
-        if key == "HTTP_ON_BEHALF_OF":
-            self.on_behalf_of = value
-        elif key == "HTTP_PACKAGING" and value is not None:
-            self.packaging = value
-        elif key == "HTTP_IN_PROGRESS":
-            self.in_progress = (value.strip() == "true")
-        elif key == "HTTP_METADATA_RELEVANT":
-            self.metadata_relevant = (value.strip() == "true")
-        elif key == "HTTP_CONTENT_MD5":
-            self.content_md5 = value
-        elif key == "HTTP_SLUG":
-            self.slug = value
+        attribute = self.webpy_header_attributes.get(key)
+        if attribute is None or (value is None and key == "HTTP_PACKAGING"):
+            return
+        name, convert = attribute
+        setattr(self, name, value if convert is None else convert(value))
 
 class DepositRequest(SWORDRequest):
     """
@@ -755,6 +771,37 @@ class Statement(object):
     """
     Class representing the Statement; a description of the object as it appears on the server
     """
+    # Clark notation names for the elements and attributes used in the serialisations, worked out once here rather
+    # than on every element
+    _ns = Namespaces()
+    ATOM_CATEGORY = _ns.ATOM + "category"
+    ATOM_CONTENT = _ns.ATOM + "content"
+    ATOM_ENTRY = _ns.ATOM + "entry"
+    ATOM_FEED = _ns.ATOM + "feed"
+    ORE_AGGREGATES = _ns.ORE + "aggregates"
+    ORE_DESCRIBES = _ns.ORE + "describes"
+    ORE_IS_DESCRIBED_BY = _ns.ORE + "isDescribedBy"
+    RDF_ABOUT = _ns.RDF + "about"
+    RDF_DATATYPE = _ns.RDF + "datatype"
+    RDF_DESCRIPTION = _ns.RDF + "Description"
+    RDF_RESOURCE = _ns.RDF + "resource"
+    RDF_RDF = _ns.RDF + "RDF"
+    SWORD_DEPOSITED_BY = _ns.SWORD + "depositedBy"
+    SWORD_DEPOSITED_ON = _ns.SWORD + "depositedOn"
+    SWORD_DEPOSITED_ON_BEHALF_OF = _ns.SWORD + "depositedOnBehalfOf"
+    SWORD_ORIGINAL_DEPOSIT = _ns.SWORD + "originalDeposit"
+    SWORD_ORIGINAL_DEPOSIT_TERM = _ns.SWORD_NS + "originalDeposit"
+    SWORD_PACKAGING = _ns.SWORD + "packaging"
+    SWORD_STATE = _ns.SWORD + "state"
+    SWORD_STATE_DESCRIPTION = _ns.SWORD + "stateDescription"
+
+    # the attributes of the category which marks an entry in the Atom serialisation as an original deposit.  This is
+    # ordered, so that the attributes come out in the same order as they would if they were set one at a time
+    original_deposit_category = OrderedDict([
+        ("scheme", _ns.SWORD_NS), ("term", SWORD_ORIGINAL_DEPOSIT_TERM), ("label", "Orignal Deposit")
+    ])
+    del _ns
+
     def __init__(self, rdf_file=None, aggregation_uri=None, rem_uri=None, original_deposits=None, aggregates=None, states=None):
         """
         The statement has 4 important properties:
@@ -809,53 +856,52 @@ class Statement(object):
         """
         Populate this statement object from the XML serialised statement to be found at the specified filepath
         """
-        f = None
-        if hasattr(filepath_or_filehandle, "read"):
-            f = filepath_or_filehandle
-        else:
-            f = open(filepath_or_filehandle, "r")
-        
-        rdf = etree.fromstring(f.read())
+        # let lxml parse straight from the file (or the file handle) rather than reading the whole document into a
+        # string first
+        rdf = etree.parse(filepath_or_filehandle).getroot()
         
+        # iterate over the elements directly rather than through getchildren(), so that no list of children is built at
+        # each level, and test each tag against the names we know until one matches
         aggs = []
-        ods = []
-        states = []
-        for desc in rdf.getchildren():
+        ods = set()
+        states = set()
+        for desc in rdf:
             packaging = None
             depositedOn = None
             deposit_by = None
             deposit_obo = None
-            about = desc.get(self.ns.RDF + "about")
-            for element in desc.getchildren():
-                if element.tag == self.ns.ORE + "aggregates":
-                    resource = element.get(self.ns.RDF + "resource")
+            about = desc.get(self.RDF_ABOUT)
+            for element in desc:
+                tag = element.tag
+                if tag == self.ORE_AGGREGATES:
+                    resource = element.get(self.RDF_RESOURCE)
                     aggs.append(resource)
-                if element.tag == self.ns.ORE + "describes":
-                    resource = element.get(self.ns.RDF + "resource")
+                elif tag == self.ORE_DESCRIBES:
+                    resource = element.get(self.RDF_RESOURCE)
                     self.aggregation_uri = resource
                     self.rem_uri = about
-                if element.tag == self.ns.SWORD + "state":
-                    state = element.get(self.ns.RDF + "resource")
-                    states.append(state)
-                if element.tag == self.ns.SWORD + "packaging":
-                    packaging = element.get(self.ns.RDF + "resource")
-                if element.tag == self.ns.SWORD + "depositedOn":
+                elif tag == self.SWORD_STATE:
+                    state = element.get(self.RDF_RESOURCE)
+                    states.add(state)
+                elif tag == self.SWORD_PACKAGING:
+                    packaging = element.get(self.RDF_RESOURCE)
+                elif tag == self.SWORD_DEPOSITED_ON:
                     deposited = element.text
                     depositedOn = datetime.strptime(deposited, "%Y-%m-%dT%H:%M:%SZ")
-                if element.tag == self.ns.SWORD + "depositedBy":
+                elif tag == self.SWORD_DEPOSITED_BY:
                     deposit_by = element.text
-                if element.tag == self.ns.SWORD + "depositedOnBehalfOf":
+                elif tag == self.SWORD_DEPOSITED_ON_BEHALF_OF:
                     deposit_obo = element.text
             if packaging is not None:
-                ods.append(about)
+                ods.add(about)
                 self.original_deposit(about, depositedOn, packaging, deposit_by, deposit_obo)
         
         # now find the state descriptions
-        for desc in rdf.getchildren():
-            about = desc.get(self.ns.RDF + "about")
+        for desc in rdf:
+            about = desc.get(self.RDF_ABOUT)
             if about in states:
-                for element in desc.getchildren():
-                    if element.tag == self.ns.SWORD + "stateDescription":
+                for element in desc:
+                    if element.tag == self.SWORD_STATE_DESCRIPTION:
                         state_description = element.text
                         self.add_state(about, state_description)
         
@@ -867,34 +913,39 @@ class Statement(object):
                 
         self.rdf = rdf
 
-    def serialise_rdf(self, existing_rdf_as_string=None):
+    def serialise_rdf(self, existing_rdf_as_string=None, pretty_print=False):
         """
-        Serialise this statement into an RDF/XML string
+        Serialise this statement into an RDF/XML string.  The output is compact unless pretty_print is True
         """
         rdf = self.get_rdf_xml(existing_rdf_as_string)
-        return etree.tostring(rdf, pretty_print=True)
+        return etree.tostring(rdf, pretty_print=pretty_print)
 
-    def serialise_atom(self):
+    def serialise_atom(self, pretty_print=False):
         """
-        Serialise this statement to an Atom Feed document
+        Serialise this statement to an Atom Feed document.  The output is compact unless pretty_print is True
         """
         # create the root atom feed element
-        feed = etree.Element(self.ns.ATOM + "feed", nsmap=self.fmap)
+        feed = etree.Element(self.ATOM_FEED, nsmap=self.fmap)
 
         # NOTE: this bit is incorrect, just in for reference, see replacement
         # implementation
         # create the sword:state term in the root of the feed
         """
         for state_uri, state_description in self.states:
-            state = etree.SubElement(feed, self.ns.SWORD + "state")
+            state = etree.SubElement(feed, self.SWORD_STATE)
             state.set("href", state_uri)
-            meaning = etree.SubElement(state, self.ns.SWORD + "stateDescription")
+            meaning = etree.SubElement(state, self.SWORD_STATE_DESCRIPTION)
             meaning.text = state_description
         """
         
-        # create the state categories
+        # the loops below can run over many files, so look up the element factory once
+        sub = etree.SubElement
+
+        # create the state categories.  These are built afresh each time rather than copied from prebuilt subtrees:
+        # the states are free-form (uri, description) pairs read back from the stored RDF, so a cache of them would be
+        # unbounded, and deep copying an element is no cheaper than creating it
         for state_uri, state_description in self.states:
-            state = etree.SubElement(feed, self.ns.ATOM + "category")
+            state = sub(feed, self.ATOM_CATEGORY)
             state.set("scheme", self.ns.SWORD_STATE)
             state.set("term", state_uri)
             state.set("label", "State")
@@ -903,41 +954,31 @@ class Statement(object):
         # now do an entry for each original deposit
         for (uri, datestamp, format_uri, by, obo) in self.original_deposits:
             # FIXME: this is not an official atom entry yet
-            entry = etree.SubElement(feed, self.ns.ATOM + "entry")
+            entry = sub(feed, self.ATOM_ENTRY)
 
-            category = etree.SubElement(entry, self.ns.ATOM + "category")
-            category.set("scheme", self.ns.SWORD_NS)
-            category.set("term", self.ns.SWORD_NS + "originalDeposit")
-            category.set("label", "Orignal Deposit")
+            sub(entry, self.ATOM_CATEGORY, self.original_deposit_category)
 
             # Media Resource Content URI (Cont-URI)
-            content = etree.SubElement(entry, self.ns.ATOM + "content")
+            content = sub(entry, self.ATOM_CONTENT)
             content.set("type", "application/zip")
             content.set("src", uri)
 
             # add all the foreign markup
 
-            format = etree.SubElement(entry, self.ns.SWORD + "packaging")
-            format.text = format_uri
-
-            deposited = etree.SubElement(entry, self.ns.SWORD + "depositedOn")
-            deposited.text = datestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-            deposit_by = etree.SubElement(entry, self.ns.SWORD + "depositedBy")
-            deposit_by.text = by
-
+            sub(entry, self.SWORD_PACKAGING).text = format_uri
+            sub(entry, self.SWORD_DEPOSITED_ON).text = _timestamp(datestamp)
+            sub(entry, self.SWORD_DEPOSITED_BY).text = by
             if obo is not None:
-                deposit_obo = etree.SubElement(entry, self.ns.SWORD + "depositedOnBehalfOf")
-                deposit_obo.text = obo
+                sub(entry, self.SWORD_DEPOSITED_ON_BEHALF_OF).text = obo
 
         # finally do an entry for all the ordinary aggregated resources
         for uri in self.aggregates:
-            entry = etree.SubElement(feed, self.ns.ATOM + "entry")
-            content = etree.SubElement(entry, self.ns.ATOM + "content")
+            entry = sub(feed, self.ATOM_ENTRY)
+            content = sub(entry, self.ATOM_CONTENT)
             content.set("type", "application/octet-stream")
             content.set("src", uri)
 
-        return etree.tostring(feed, pretty_print=True)
+        return etree.tostring(feed, pretty_print=pretty_print)
 
     def _is_rem(self, rdf):
         valid = True
@@ -948,18 +989,18 @@ class Statement(object):
         rem_uri = None
         aggregation_uri = None
         is_described_by_uris = []
-        for desc in rdf.findall(self.ns.RDF + "Description"):
+        for desc in rdf.findall(self.RDF_DESCRIPTION):
             # look for the describes tag
-            ore_desc = desc.find(self.ns.ORE + "describes")
+            ore_desc = desc.find(self.ORE_DESCRIBES)
             if ore_desc is not None:
-                describes_uri = ore_desc.get(self.ns.RDF + "resource")
-                rem_uri = desc.get(self.ns.RDF + "about")
+                describes_uri = ore_desc.get(self.RDF_RESOURCE)
+                rem_uri = desc.get(self.RDF_ABOUT)
             # look for the isDescribedBy tag
-            ore_idb = desc.findall(self.ns.ORE + "isDescribedBy")
+            ore_idb = desc.findall(self.ORE_IS_DESCRIBED_BY)
             if len(ore_idb) > 0:
-                aggregation_uri = desc.get(self.ns.RDF + "about")
+                aggregation_uri = desc.get(self.RDF_ABOUT)
                 for idb in ore_idb:
-                    is_described_by_uris.append(idb.get(self.ns.RDF + "resource"))
+                    is_described_by_uris.append(idb.get(self.RDF_RESOURCE))
         
         # now check that all those uris tie up:
         if describes_uri != aggregation_uri:
@@ -975,15 +1016,15 @@ class Statement(object):
         return valid
 
     def _get_aggregation_element(self, rdf):
-        for desc in rdf.findall(self.ns.RDF + "Description"):
-            ore_idb = desc.findall(self.ns.ORE + "isDescribedBy")
+        for desc in rdf.findall(self.RDF_DESCRIPTION):
+            ore_idb = desc.findall(self.ORE_IS_DESCRIBED_BY)
             if len(ore_idb) > 0:
                 return desc
         return None
 
     def _get_description_element(self, rdf, uri):
-        for desc in rdf.findall(self.ns.RDF + "Description"):
-            about = desc.get(self.ns.RDF + "about")
+        for desc in rdf.findall(self.RDF_DESCRIPTION):
+            about = desc.get(self.RDF_ABOUT)
             if about == uri:
                 return desc
         return None
@@ -1008,76 +1049,73 @@ class Statement(object):
                 aggregation = self._get_description_element(rdf, self.aggregation_uri)    
         else:
             # create the RDF root
-            rdf = etree.Element(self.ns.RDF + "RDF", nsmap=self.smap)
+            rdf = etree.Element(self.RDF_RDF, nsmap=self.smap)
 
         # these operations ensure that an existing rdf document becomes a resource
         # map
         if not is_rem:
             # in the RDF root create a Description for the REM which ore:describes the Aggregation
-            description1 = etree.SubElement(rdf, self.ns.RDF + "Description", nsmap=self.smap)
-            description1.set(self.ns.RDF + "about", self.rem_uri)
-            describes = etree.SubElement(description1, self.ns.ORE + "describes", nsmap=self.smap)
-            describes.set(self.ns.RDF + "resource", self.aggregation_uri)
+            description1 = etree.SubElement(rdf, self.RDF_DESCRIPTION, {self.RDF_ABOUT : self.rem_uri}, nsmap=self.smap)
+            etree.SubElement(description1, self.ORE_DESCRIBES, {self.RDF_RESOURCE : self.aggregation_uri}, nsmap=self.smap)
 
         if aggregation is not None and not is_rem:
             # there is already an rdf:Description for the element, but it hasn't
             # been properly linked to the ReM yet
-            idb = etree.SubElement(aggregation, self.ns.ORE + "isDescribedBy", nsmap=self.smap)
-            idb.set(self.ns.RDF + "resource", self.rem_uri)
+            etree.SubElement(aggregation, self.ORE_IS_DESCRIBED_BY, {self.RDF_RESOURCE : self.rem_uri}, nsmap=self.smap)
 
         if aggregation is None:
             # CREATE THE AGGREGATION
             # in the RDF root create a Description for the Aggregation which is ore:isDescribedBy the REM
-            aggregation = etree.SubElement(rdf, self.ns.RDF + "Description", nsmap=self.smap)
-            aggregation.set(self.ns.RDF + "about", self.aggregation_uri)
-            idb = etree.SubElement(aggregation, self.ns.ORE + "isDescribedBy", nsmap=self.smap)
-            idb.set(self.ns.RDF + "resource", self.rem_uri)
+            aggregation = etree.SubElement(rdf, self.RDF_DESCRIPTION, {self.RDF_ABOUT : self.aggregation_uri}, nsmap=self.smap)
+            etree.SubElement(aggregation, self.ORE_IS_DESCRIBED_BY, {self.RDF_RESOURCE : self.rem_uri}, nsmap=self.smap)
 
         # we want to create an ORE resource map, and also add on the sword specific bits for the original deposits and the state
+
+        # the loops below can run over many files, so look up the element factory, namespace map and attribute names
+        # once.  Each element in them has a single attribute, so it is passed straight to the factory
+        sub = etree.SubElement
+        smap = self.smap
+        about = self.RDF_ABOUT
+        resource = self.RDF_RESOURCE
+        datatype = self.RDF_DATATYPE
         
         # Create ore:aggregates for all ordinary aggregated files
         # First build a list of all the urls which are already referred to in the existing rem
         existing_a = []
-        existing_aggregates = aggregation.findall(self.ns.ORE + "aggregates")
+        existing_aggregates = aggregation.findall(self.ORE_AGGREGATES)
         for ea in existing_aggregates:
-            existing_a.append(ea.get(self.ns.RDF + "resource"))
+            existing_a.append(ea.get(self.RDF_RESOURCE))
         ssslog.debug("Existing aggregated resources: " + str(existing_a))
         ssslog.debug("Adding aggregated resources: " + str(self.aggregates))
         for uri in self.aggregates:
             if uri in existing_a:
                 continue
-            aggregates = etree.SubElement(aggregation, self.ns.ORE + "aggregates", nsmap=self.smap)
-            aggregates.set(self.ns.RDF + "resource", uri)
+            sub(aggregation, self.ORE_AGGREGATES, {resource : uri}, nsmap=smap)
             existing_a.append(uri) # remember that we've added this aggregation, in case there are duplicates in original_deposits
 
         # Create ore:aggregates and sword:originalDeposit relations for the original deposits
         existing_od = []
-        existing_ods = aggregation.findall(self.ns.SWORD + "originalDeposit")
+        existing_ods = aggregation.findall(self.SWORD_ORIGINAL_DEPOSIT)
         for eo in existing_ods:
-            existing_od.append(eo.get(self.ns.RDF + "resource"))
+            existing_od.append(eo.get(self.RDF_RESOURCE))
         ssslog.debug("Existing original deposits: " + str(existing_od))
         for (uri, datestamp, format, by, obo) in self.original_deposits:
             # standard ORE aggregates statement
             if uri not in existing_a:
                 ssslog.debug("Adding aggregated resource: " + uri)
-                aggregates = etree.SubElement(aggregation, self.ns.ORE + "aggregates", nsmap=self.smap)
-                aggregates.set(self.ns.RDF + "resource", uri)
+                sub(aggregation, self.ORE_AGGREGATES, {resource : uri}, nsmap=smap)
 
             # assert that this is an original package
             if uri not in existing_od:
                 ssslog.debug("Adding original deposit: " + uri)
-                original = etree.SubElement(aggregation, self.ns.SWORD + "originalDeposit", nsmap=self.smap)
-                original.set(self.ns.RDF + "resource", uri)
+                sub(aggregation, self.SWORD_ORIGINAL_DEPOSIT, {resource : uri}, nsmap=smap)
 
         # now do the state information
         for state_uri, state_description in self.states:
-            state = etree.SubElement(aggregation, self.ns.SWORD + "state", nsmap=self.smap)
-            state.set(self.ns.RDF + "resource", state_uri)
+            sub(aggregation, self.SWORD_STATE, {resource : state_uri}, nsmap=smap)
             
-            sdesc = etree.SubElement(rdf, self.ns.RDF + "Description", nsmap=self.smap)
-            sdesc.set(self.ns.RDF + "about", state_uri)
-            meaning = etree.SubElement(sdesc, self.ns.SWORD + "stateDescription", nsmap=self.smap)
-            meaning.text = state_description
+            sdesc = sub(rdf, self.RDF_DESCRIPTION, {about : state_uri}, nsmap=smap)
+            sub(sdesc, self.SWORD_STATE_DESCRIPTION, nsmap=smap).text = state_description
 
         # Build the Description elements for the original deposits, with their sword:depositedOn and sword:packaging
         # relations
@@ -1085,27 +1123,22 @@ class Statement(object):
             if uri is None:
                 continue
             
-            desc = etree.SubElement(rdf, self.ns.RDF + "Description", nsmap=self.smap)
-            desc.set(self.ns.RDF + "about", uri)
+            desc = sub(rdf, self.RDF_DESCRIPTION, {about : uri}, nsmap=smap)
 
             if format_uri is not None:
-                format = etree.SubElement(desc, self.ns.SWORD + "packaging", nsmap=self.smap)
-                format.set(self.ns.RDF + "resource", format_uri)
+                sub(desc, self.SWORD_PACKAGING, {resource : format_uri}, nsmap=smap)
 
             if datestamp is not None:
-                deposited = etree.SubElement(desc, self.ns.SWORD + "depositedOn", nsmap=self.smap)
-                deposited.set(self.ns.RDF + "datatype", "http://www.w3.org/2001/XMLSchema#dateTime")
-                deposited.text = datestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
+                sub(desc, self.SWORD_DEPOSITED_ON, {datatype : "http://www.w3.org/2001/XMLSchema#dateTime"},
+                    nsmap=smap).text = _timestamp(datestamp)
 
             if by is not None:
-                deposit_by = etree.SubElement(desc, self.ns.SWORD + "depositedBy", nsmap=self.smap)
-                deposit_by.set(self.ns.RDF + "datatype", "http://www.w3.org/2001/XMLSchema#string")
-                deposit_by.text = by
+                sub(desc, self.SWORD_DEPOSITED_BY, {datatype : "http://www.w3.org/2001/XMLSchema#string"},
+                    nsmap=smap).text = by
 
             if obo is not None:
-                deposit_obo = etree.SubElement(desc, self.ns.SWORD + "depositedOnBehalfOf", nsmap=self.smap)
-                deposit_obo.set(self.ns.RDF + "datatype", "http://www.w3.org/2001/XMLSchema#string")
-                deposit_obo.text = obo
+                sub(desc, self.SWORD_DEPOSITED_ON_BEHALF_OF, {datatype : "http://www.w3.org/2001/XMLSchema#string"},
+                    nsmap=smap).text = obo
 
         return rdf
         
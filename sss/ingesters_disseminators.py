@@ -6,6 +6,53 @@ from sss_logging import logging
 ssslog = logging.getLogger(__name__)
 
 
+# the atom elements which the ingesters take metadata from, with the dcterms key that each is stored under
+_ns = Namespaces()
+_ENTRY_ATOM_AUTHOR = _ns.ATOM + "author"
+_ENTRY_ATOM_KEYS = {
+    _ns.ATOM + "title" : "title",
+    _ns.ATOM + "updated" : "date",
+    _ENTRY_ATOM_AUTHOR : "creator",
+    _ns.ATOM + "summary" : "abstract"
+}
+_ENTRY_DC = _ns.DC
+del _ns
+
+def _extract_entry_metadata(entry, metadata):
+    """
+    Add the metadata in the children of the supplied atom entry element to the metadata dictionary, in a single pass
+    over the entry.  The atom based metadata goes in before any of the dcterms, so that it comes first where they
+    share a key
+    """
+    # we operate an additive policy with metadata.  Duplicate keys are allowed, but duplicate key/value pairs are not.
+    def a_insert(key, value):
+        values = metadata.get(key)
+        if values is None:
+            metadata[key] = [value]
+        elif value not in values:
+            values.append(value)
+
+    atom_keys = _ENTRY_ATOM_KEYS
+    dc = _ENTRY_DC
+    dc_len = len(dc)
+    dcterms = []
+
+    for element in entry:
+        tag = element.tag
+        if not isinstance(tag, basestring):
+            continue
+        key = atom_keys.get(tag)
+        if key is not None:
+            if tag == _ENTRY_ATOM_AUTHOR:
+                a_insert(key, " ".join([names.text.strip() for names in element]).strip())
+            else:
+                a_insert(key, element.text.strip())
+        elif tag.startswith(dc):
+            dcterms.append((tag[dc_len:], element.text.strip()))
+
+    for key, value in dcterms:
+        a_insert(key, value)
+
 class DisseminationPackager(object):
     def __init__(self, dao, uri_manager):
         pass
@@ -62,6 +109,13 @@ class DefaultDisseminator(DisseminationPackager):
         return zpath
 
 class FeedDisseminator(DisseminationPackager):
+    # Clark notation names for the feed elements
+    _ns = Namespaces()
+    ATOM_FEED = _ns.ATOM + "feed"
+    ATOM_ENTRY = _ns.ATOM + "entry"
+    ATOM_LINK = _ns.ATOM + "link"
+    del _ns
+
     def __init__(self, dao, uri_manager):
         self.dao = dao
         self.ns = Namespaces()
@@ -74,27 +128,26 @@ class FeedDisseminator(DisseminationPackager):
         files = self.dao.list_content(collection, id, exclude=["mediaresource.feed.xml"])
 
         # create a feed object with all the files as entries
-        feed = etree.Element(self.ns.ATOM + "feed", nsmap=self.nsmap)
+        feed = etree.Element(self.ATOM_FEED, nsmap=self.nsmap)
         
         for file in files:
-            entry = etree.SubElement(feed, self.ns.ATOM + "entry")
+            entry = etree.SubElement(feed, self.ATOM_ENTRY)
             
-            em = etree.SubElement(entry, self.ns.ATOM + "link")
+            em = etree.SubElement(entry, self.ATOM_LINK)
             em.set("rel", "edit-media")
             em.set("href", self.um.part_uri(collection, id, file))
             
-            edit = etree.SubElement(entry, self.ns.ATOM + "link")
+            edit = etree.SubElement(entry, self.ATOM_LINK)
             edit.set("rel", "edit")
             edit.set("href", self.um.part_uri(collection, id, file) + ".atom")
             
-            content = etree.SubElement(entry, self.ns.ATOM + "link")
+            content = etree.SubElement(entry, self.ATOM_LINK)
             content.set("type", "application/octet-stream") # FIXME: we're not storing content types, so we don't know
             content.set("src", self.um.part_uri(collection, id, file))
         
+        # let lxml serialise straight into the file, rather than building the whole document as a string first
         fpath = self.dao.get_store_path(collection, id, "mediaresource.feed.xml")
-        f = open(fpath, "wb")
-        f.write(etree.tostring(feed, pretty_print=True))
-        f.close()
+        etree.ElementTree(feed).write(fpath, pretty_print=self.dao.configuration.pretty_print)
         
         return fpath
         
@@ -141,43 +194,11 @@ class SimpleZipIngester(IngestPackager):
         entry = etree.fromstring(atom)
 
         # go through each element in the atom entry and just process the ones we care about
-        # explicitly retrieve the atom based metadata first
-        for element in entry.getchildren():
-            if element.tag == self.ns.ATOM + "title":
-                self.a_insert(metadata, "title", element.text.strip())
-            if element.tag == self.ns.ATOM + "updated":
-                self.a_insert(metadata, "date", element.text.strip())
-            if element.tag == self.ns.ATOM + "author":
-                authors = ""
-                for names in element.getchildren():
-                    authors += names.text.strip() + " "
-                self.a_insert(metadata, "creator", authors.strip())
-            if element.tag == self.ns.ATOM + "summary":
-                self.a_insert(metadata, "abstract", element.text.strip())
-
-        # now go through and retrieve the dcterms from the entry
-        for element in entry.getchildren():
-            if not isinstance(element.tag, basestring):
-                continue
-                
-            # we operate an additive policy with metadata.  Duplicate
-            # keys are allowed, but duplicate key/value pairs are not.
-            if element.tag.startswith(self.ns.DC):
-                key = element.tag[len(self.ns.DC):]
-                val = element.text.strip()
-                self.a_insert(metadata, key, val)
+        _extract_entry_metadata(entry, metadata)
 
         self.dao.store_metadata(collection, id, metadata)
         
         return derived_resources
-        
-    def a_insert(self, d, key, value):
-        if d.has_key(key):
-            vs = d[key]
-            if value not in vs:
-                d[key].append(value)
-        else:
-            d[key] = [value]
 
 class METSDSpaceIngester(IngestPackager):
     def ingest(self, collection, id, filename, metadata_relevant):
@@ -208,40 +229,8 @@ class DefaultEntryIngester(object):
         entry = etree.fromstring(atom)
 
         # go through each element in the atom entry and just process the ones we care about
-        # explicitly retrieve the atom based metadata first
-        for element in entry.getchildren():
-            if element.tag == self.ns.ATOM + "title":
-                self.a_insert(metadata, "title", element.text.strip())
-            if element.tag == self.ns.ATOM + "updated":
-                self.a_insert(metadata, "date", element.text.strip())
-            if element.tag == self.ns.ATOM + "author":
-                authors = ""
-                for names in element.getchildren():
-                    authors += names.text.strip() + " "
-                self.a_insert(metadata, "creator", authors.strip())
-            if element.tag == self.ns.ATOM + "summary":
-                self.a_insert(metadata, "abstract", element.text.strip())
-
-        # now go through and retrieve the dcterms from the entry
-        for element in entry.getchildren():
-            if not isinstance(element.tag, basestring):
-                continue
-                
-            # we operate an additive policy with metadata.  Duplicate
-            # keys are allowed, but duplicate key/value pairs are not.
-            if element.tag.startswith(self.ns.DC):
-                key = element.tag[len(self.ns.DC):]
-                val = element.text.strip()
-                self.a_insert(metadata, key, val)
+        _extract_entry_metadata(entry, metadata)
 
         ssslog.debug("Current Metadata (extracted + previously existing): " + str(metadata))
 
         self.dao.store_metadata(collection, id, metadata)
-
-    def a_insert(self, d, key, value):
-        if d.has_key(key):
-            vs = d[key]
-            if value not in vs:
-                d[key].append(value)
-        else:
-            d[key] = [value]
@@ -10,6 +10,10 @@ from info import __version__
 from sss_logging import logging
 ssslog = logging.getLogger(__name__)
 
+# buffer size for the files the DAO reads and writes; large enough that a typical statement, feed or metadata
+# document goes through in a single system call
+_IO_BUF = 1 << 17
+
 class WebInterface(WebUI):
     def get(self, path=None):
         if path is not None:
@@ -271,7 +275,7 @@ class SSS(SwordServer):
         # if the collection path does not exist, then return the empty feed
         cpath = os.path.join(self.configuration.store_dir, str(id))
         if not os.path.exists(cpath):
-            return etree.tostring(feed, pretty_print=True)
+            return etree.tostring(feed, pretty_print=self.configuration.pretty_print)
 
         # list all of the containers in the collection
         parts = os.listdir(cpath)
@@ -293,8 +297,8 @@ class SSS(SwordServer):
             link2.set("type", "text/html")
             link2.set("href", self.um.edit_uri(id, part))
 
-        # pretty print and return
-        return etree.tostring(feed, pretty_print=True)
+        # serialise (pretty printed only if configured to) and return
+        return etree.tostring(feed, pretty_print=self.configuration.pretty_print)
 
     def deposit_new(self, collection, deposit):
         """
@@ -1026,9 +1030,21 @@ class DAO(object):
         Shortcut to save the content to the filepath with the associated file handle opts (defaults to "w", so pass
         in "wb" for binary files
         """
-        f = open(filepath, opts)
-        f.write(content)
-        f.close()
+        f = open(filepath, opts, _IO_BUF)
+        try:
+            f.write(content)
+        finally:
+            f.close()
+
+    def read(self, filepath):
+        """
+        Shortcut to read back the content of a stored file, as the byte string which was saved
+        """
+        f = open(filepath, "rb", _IO_BUF)
+        try:
+            return f.read()
+        finally:
+            f.close()
 
     def get_filename(self, filename):
         """
@@ -1056,10 +1072,10 @@ class DAO(object):
         """ Store the supplied statement document content in the object idenfied by the id in the specified collection """
         # store the RDF version
         sfile = os.path.join(self.configuration.store_dir, collection, id, "sss_statement.xml")
-        self.save(sfile, statement.serialise_rdf())
+        self.save(sfile, statement.serialise_rdf(pretty_print=self.configuration.pretty_print))
         # store the Atom Feed version
         sfile = os.path.join(self.configuration.store_dir, collection, id, "sss_statement.atom.xml")
-        self.save(sfile, statement.serialise_atom())
+        self.save(sfile, statement.serialise_atom(pretty_print=self.configuration.pretty_print))
 
     def store_deposit_receipt(self, collection, id, receipt):
         """ Store the supplied receipt document content in the object idenfied by the id in the specified collection """
@@ -1083,13 +1099,16 @@ class DAO(object):
         if not self.file_exists(collection, id, "sss_metadata.xml"):
             return {}
         mfile = os.path.join(self.configuration.store_dir, collection, id, "sss_metadata.xml")
-        f = open(mfile, "r")
-        metadata = etree.fromstring(f.read())
+        metadata = etree.parse(mfile).getroot()
+        # the dcterms namespace is a fixed prefix of the Clark notation tag, so a prefix test against it (held
+        # locally, along with its length) is all the namespace check we need
+        dc_ns = self.ns.DC
+        dc_len = len(dc_ns)
         md = {}
-        for dc in metadata.getchildren():
+        for dc in metadata:
             tag = dc.tag
-            if tag.startswith(self.ns.DC):
-                tag = tag[len(self.ns.DC):]
+            if tag.startswith(dc_ns):
+                tag = tag[dc_len:]
             if md.has_key(tag):
                 md[tag].append(dc.text.strip())
             else:
@@ -1138,25 +1157,21 @@ class DAO(object):
 
     def get_deposit_receipt_content(self, collection, id):
         """ Read the deposit receipt for the specified container """
-        f = open(self.get_store_path(collection, id, "sss_deposit-receipt.xml"), "r")
-        return f.read()
+        return self.read(self.get_store_path(collection, id, "sss_deposit-receipt.xml"))
 
     def get_statement_content(self, collection, id):
         """ Read the statement for the specified container """
-        f = open(self.get_store_path(collection, id, "sss_statement.xml"), "r")
-        return f.read()
+        return self.read(self.get_store_path(collection, id, "sss_statement.xml"))
 
     def get_statement_feed(self, collection, id):
         """ Read the statement for the specified container """
-        f = open(self.get_store_path(collection, id, "sss_statement.atom.xml"), "r")
-        return f.read()
+        return self.read(self.get_store_path(collection, id, "sss_statement.atom.xml"))
 
     def get_atom_content(self, collection, id):
         """ Read the statement for the specified container """
         if not self.file_exists(collection, id, "atom.xml"):
             return None
-        f = open(self.get_store_path(collection, id, "atom.xml"), "r")
-        return f.read()
+        return self.read(self.get_store_path(collection, id, "atom.xml"))
 
     def load_statement(self, collection, id):
         """
@@ -7,58 +7,60 @@ ssslog = logging.getLogger(__name__)
 # FIXME: this is a poorly constructed object
 class Namespaces(object):
     """
-    This class encapsulates all the namespace declarations that we will need
+    This class encapsulates all the namespace declarations that we will need.  They are all constants, so they are
+    held on the class itself and instances carry no state of their own
     """
-    def __init__(self):
-        # AtomPub namespace and lxml format
-        self.APP_NS = "http://www.w3.org/2007/app"
-        self.APP = "{%s}" % self.APP_NS
-        self.APP_PREFIX = "app"
-
-        # Atom namespace and lxml format
-        self.ATOM_NS = "http://www.w3.org/2005/Atom"
-        self.ATOM = "{%s}" % self.ATOM_NS
-        self.ATOM_PREFIX = "atom"
-
-        # SWORD namespace and lxml format
-        self.SWORD_NS = "http://purl.org/net/sword/terms/"
-        self.SWORD = "{%s}" % self.SWORD_NS
-        self.SWORD_PREFIX = "sword"
-        
-        # SWORD State Scheme
-        self.SWORD_STATE = self.SWORD_NS + "state"
-
-        # Dublin Core namespace and lxml format
-        self.DC_NS = "http://purl.org/dc/terms/"
-        self.DC = "{%s}" % self.DC_NS
-        self.DC_PREFIX = "dcterms"
-
-        # RDF namespace and lxml format
-        self.RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
-        self.RDF = "{%s}" % self.RDF_NS
-        self.RDF_PREFIX = "rdf"
-
-        # ORE namespace and lxml format
-        self.ORE_NS = "http://www.openarchives.org/ore/terms/"
-        self.ORE = "{%s}" % self.ORE_NS
-        self.ORE_PREFIX = "ore"
-
-        # ORE ATOM
-        self.ORE_ATOM_NS = "http://www.openarchives.org/ore/atom/"
-        self.ORE_ATOM = "{%s}" % self.ORE_ATOM_NS
-        self.ORE_ATOM_PREFIX = "oreatom"
-        
-        # lookup dictionary
-        self.prefix = {
-            self.APP_NS : self.APP_PREFIX,
-            self.ATOM_NS : self.ATOM_PREFIX,
-            self.SWORD_NS : self.SWORD_PREFIX,
-            self.DC_NS : self.DC_PREFIX,
-            self.RDF_NS : self.RDF_PREFIX,
-            self.ORE_NS : self.ORE_PREFIX,
-            self.ORE_ATOM_NS : self.ORE_ATOM_PREFIX
-        }
-        
+    __slots__ = ()
+
+    # AtomPub namespace and lxml format
+    APP_NS = "http://www.w3.org/2007/app"
+    APP = "{%s}" % APP_NS
+    APP_PREFIX = "app"
+
+    # Atom namespace and lxml format
+    ATOM_NS = "http://www.w3.org/2005/Atom"
+    ATOM = "{%s}" % ATOM_NS
+    ATOM_PREFIX = "atom"
+
+    # SWORD namespace and lxml format
+    SWORD_NS = "http://purl.org/net/sword/terms/"
+    SWORD = "{%s}" % SWORD_NS
+    SWORD_PREFIX = "sword"
+    
+    # SWORD State Scheme
+    SWORD_STATE = SWORD_NS + "state"
+
+    # Dublin Core namespace and lxml format
+    DC_NS = "http://purl.org/dc/terms/"
+    DC = "{%s}" % DC_NS
+    DC_PREFIX = "dcterms"
+
+    # RDF namespace and lxml format
+    RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+    RDF = "{%s}" % RDF_NS
+    RDF_PREFIX = "rdf"
+
+    # ORE namespace and lxml format
+    ORE_NS = "http://www.openarchives.org/ore/terms/"
+    ORE = "{%s}" % ORE_NS
+    ORE_PREFIX = "ore"
+
+    # ORE ATOM
+    ORE_ATOM_NS = "http://www.openarchives.org/ore/atom/"
+    ORE_ATOM = "{%s}" % ORE_ATOM_NS
+    ORE_ATOM_PREFIX = "oreatom"
+    
+    # lookup dictionary
+    prefix = {
+        APP_NS : APP_PREFIX,
+        ATOM_NS : ATOM_PREFIX,
+        SWORD_NS : SWORD_PREFIX,
+        DC_NS : DC_PREFIX,
+        RDF_NS : RDF_PREFIX,
+        ORE_NS : ORE_PREFIX,
+        ORE_ATOM_NS : ORE_ATOM_PREFIX
+    }
+
 class Errors(object):
     content = "http://purl.org/net/sword/error/ErrorContent"
     checksum_mismatch = "http://purl.org/net/sword/error/ErrorChecksumMismatch"
@@ -107,6 +109,7 @@ class HttpHeaders(object):
         slug : None,
         content_length : 0
     }
+    sword_header_names = frozenset(sword_headers)
     
     allowed_values = {
         in_progress.lower() : ["true", "false"],
@@ -216,14 +219,11 @@ class HttpHeaders(object):
 
     def get_sword_headers(self, header_dict):
         normalised_dict = dict([(h.lower(), v) for h, v in header_dict.items()])
-        headers = {}
-        for head, value in normalised_dict.items():
-            # is it a sword header
-            if HttpHeaders.sword_headers.has_key(head):
-                headers[head] = value
-        for head, default in HttpHeaders.sword_headers.items():
-            if head not in headers.keys():
-                headers[head] = default
+        # start from the defaults, and take the sword headers which are in the request by intersecting the two sets of
+        # names once, rather than testing every request header against them
+        headers = dict(HttpHeaders.sword_headers)
+        for head in HttpHeaders.sword_header_names.intersection(normalised_dict):
+            headers[head] = normalised_dict[head]
         return headers
         
     def extract_filename(self, header_dict):
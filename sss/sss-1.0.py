@@ -4,10 +4,14 @@ __version__ = "2.0"
 __author__ = ["Richard Jones <richard@cottagelabs.com>"]
 __license__ = "bsd"
 
-import web, uuid, os, re, base64, hashlib, urllib, sys, logging, logging.config
+import web, uuid, os, re, base64, binascii, hashlib, hmac, urllib, sys, io, tempfile, logging, logging.config
 from lxml import etree
+from xml.sax.saxutils import escape
 from datetime import datetime
-from zipfile import ZipFile
+from zipfile import ZipFile, ZIP_STORED
+from copy import deepcopy
+from itertools import groupby
+from collections import namedtuple, OrderedDict
 from web.wsgiserver import CherryPyWSGIServer
 
 # SERVER CONFIGURATION
@@ -143,6 +147,10 @@ class Configuration(object):
 
         # we can turn off deposit receipts, which is allowed by the specification
         self.return_deposit_receipt = True
+
+        # pretty print the XML documents that SSS generates.  Clients don't need this, so it is off by default, but
+        # turn it on if you want to read the responses yourself
+        self.pretty_print = False
         
         # generate a UUID to represent this request, for logging purposes
         self.rid = str(uuid.uuid4())
@@ -160,36 +168,38 @@ class ApacheConfiguration(Configuration):
 
 class Namespaces(object):
     """
-    This class encapsulates all the namespace declarations that we will need
+    This class encapsulates all the namespace declarations that we will need.  They are all constants, so they are
+    held on the class itself and instances carry no state of their own
     """
-    def __init__(self):
-        # AtomPub namespace and lxml format
-        self.APP_NS = "http://www.w3.org/2007/app"
-        self.APP = "{%s}" % self.APP_NS
+    __slots__ = ()
 
-        # Atom namespace and lxml format
-        self.ATOM_NS = "http://www.w3.org/2005/Atom"
-        self.ATOM = "{%s}" % self.ATOM_NS
+    # AtomPub namespace and lxml format
+    APP_NS = "http://www.w3.org/2007/app"
+    APP = "{%s}" % APP_NS
 
-        # SWORD namespace and lxml format
-        self.SWORD_NS = "http://purl.org/net/sword/terms/"
-        self.SWORD = "{%s}" % self.SWORD_NS
+    # Atom namespace and lxml format
+    ATOM_NS = "http://www.w3.org/2005/Atom"
+    ATOM = "{%s}" % ATOM_NS
 
-        # Dublin Core namespace and lxml format
-        self.DC_NS = "http://purl.org/dc/terms/"
-        self.DC = "{%s}" % self.DC_NS
+    # SWORD namespace and lxml format
+    SWORD_NS = "http://purl.org/net/sword/terms/"
+    SWORD = "{%s}" % SWORD_NS
 
-        # RDF namespace and lxml format
-        self.RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
-        self.RDF = "{%s}" % self.RDF_NS
+    # Dublin Core namespace and lxml format
+    DC_NS = "http://purl.org/dc/terms/"
+    DC = "{%s}" % DC_NS
 
-        # ORE namespace and lxml format
-        self.ORE_NS = "http://www.openarchives.org/ore/terms/"
-        self.ORE = "{%s}" % self.ORE_NS
+    # RDF namespace and lxml format
+    RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+    RDF = "{%s}" % RDF_NS
 
-        # ORE ATOM
-        self.ORE_ATOM_NS = "http://www.openarchives.org/ore/atom/"
-        self.ORE_ATOM = "{%s}" % self.ORE_ATOM_NS
+    # ORE namespace and lxml format
+    ORE_NS = "http://www.openarchives.org/ore/terms/"
+    ORE = "{%s}" % ORE_NS
+
+    # ORE ATOM
+    ORE_ATOM_NS = "http://www.openarchives.org/ore/atom/"
+    ORE_ATOM = "{%s}" % ORE_ATOM_NS
 
 # SWORD URLS
 #############################################################################
@@ -243,7 +253,7 @@ class SwordHttpHandler(object):
         else:
             # assuming Basic authentication, get the username and password
             auth = re.sub('^Basic ','',auth)
-            username, password = base64.decodestring(auth).split(':')
+            username, password = base64.b64decode(auth).split(':')
             ssslog.info("Authentication details: " + str(username) + ":" + str(password) + "; On Behalf Of: " + str(obo))
 
             # if the username and password don't match, bounce the user with a 401
@@ -263,13 +273,32 @@ class SwordHttpHandler(object):
             return Auth(user, obo)
         return Auth(user)
 
+    def _respond_atom(self, status, location, body):
+        """
+        Send an Atom Entry (usually a deposit receipt) back to the client with the given status, and a Location
+        header if one is supplied
+        """
+        web.header("Content-Type", "application/atom+xml;type=entry")
+        if location is not None:
+            web.header("Location", location)
+        web.ctx.status = status
+        return body
+
+    def _respond_error(self, status, error):
+        """
+        Send a sword error document back to the client with the given status
+        """
+        web.header("Content-Type", "text/xml")
+        web.ctx.status = status
+        return error
+
 class ServiceDocument(SwordHttpHandler):
     """
     Handle all requests for Service documents (requests to SD-URI)
     """
     def GET(self, sub=None):
         """ GET the service document - returns an XML document """
-        ssslog.debug("GET on Service Document; Incoming HTTP headers: " + str(web.ctx.environ))
+        ssslog.debug("GET on Service Document; Incoming HTTP headers: %s", web.ctx.environ)
         
         # authenticate
         auth = self.authenticate(web)
@@ -300,7 +329,7 @@ class Collection(SwordHttpHandler):
         - collection:   The ID of the collection as specified in the requested URL
         Returns an XML document with some metadata about the collection and the contents of that collection
         """
-        ssslog.debug("GET on Collection (list collection contents); Incoming HTTP headers: " + str(web.ctx.environ))
+        ssslog.debug("GET on Collection (list collection contents); Incoming HTTP headers: %s", web.ctx.environ)
         
         # authenticate
         auth = self.authenticate(web)
@@ -326,7 +355,7 @@ class Collection(SwordHttpHandler):
         - collection:   The ID of the collection as specified in the requested URL
         Returns a Deposit Receipt
         """
-        ssslog.debug("POST to Collection (create new item); Incoming HTTP headers: " + str(web.ctx.environ))
+        ssslog.debug("POST to Collection (create new item); Incoming HTTP headers: %s", web.ctx.environ)
         
         # authenticate
         auth = self.authenticate(web)
@@ -369,20 +398,15 @@ class Collection(SwordHttpHandler):
         # created, accepted, or error
         if result.created:
             print cfg.rid + " Item created"
-            web.header("Content-Type", "application/atom+xml;type=entry")
-            web.header("Location", result.location)
-            web.ctx.status = "201 Created"
-            if cfg.return_deposit_receipt:
+            if RETURN_DEPOSIT_RECEIPT:
                 print cfg.rid + " Returning deposit receipt"
-                return result.receipt
+                return self._respond_atom("201 Created", result.location, result.receipt)
             else:
                 print cfg.rid + " Omitting deposit receipt"
-                return
+                return self._respond_atom("201 Created", result.location, None)
         else:
             print cfg.rid + " Returning Error"
-            web.header("Content-Type", "text/xml")
-            web.ctx.status = result.error_code
-            return result.error
+            return self._respond_error(result.error_code, result.error)
 
 class MediaResourceContent(SwordHttpHandler):
     """
@@ -399,7 +423,7 @@ class MediaResourceContent(SwordHttpHandler):
         Returns the content in the requested format
         """
         
-        ssslog.debug("GET on MediaResourceContent; Incoming HTTP headers: " + str(web.ctx.environ))
+        ssslog.debug("GET on MediaResourceContent; Incoming HTTP headers: %s", web.ctx.environ)
         
         # check to see if we're after the .atom version of the content
         atom = False
@@ -459,7 +483,7 @@ class MediaResourceContent(SwordHttpHandler):
             web.header("Content-Type", content_type.mimetype())
             if media_resource.packaging is not None:
                 web.header("Packaging", media_resource.packaging)
-            f = open(media_resource.filepath, "r")
+            f = open(media_resource.filepath, "rb")
             web.ctx.status = "200 OK"
             return f.read()
 
@@ -477,11 +501,10 @@ class MediaResource(MediaResourceContent):
         - id:   the ID of the media resource as specified in the URL
         Returns a Deposit Receipt
         """
-        ssslog.debug("PUT on Media Resource (replace); Incoming HTTP headers: " + str(web.ctx.environ))
+        ssslog.debug("PUT on Media Resource (replace); Incoming HTTP headers: %s", web.ctx.environ)
         
         # find out if update is allowed
-        cfg = global_configuration
-        if not cfg.allow_update:
+        if not ALLOW_UPDATE:
             spec = SWORDSpec()
             ss = SWORDServer()
             error = ss.sword_error(spec.error_method_not_allowed_uri, "Update operations not currently permitted")
@@ -536,9 +559,7 @@ class MediaResource(MediaResourceContent):
             return
         else:
             ssslog.info("Returning Error")
-            web.header("Content-Type", "text/xml")
-            web.ctx.status = result.error_code
-            return result.error
+            return self._respond_error(result.error_code, result.error)
 
     def DELETE(self, id):
         """
@@ -548,11 +569,10 @@ class MediaResource(MediaResourceContent):
         - id:   the ID of the object to have its content removed as per the requested URI
         Return a Deposit Receipt
         """
-        ssslog.debug("DELETE on Media Resource (remove content, leave container); Incoming HTTP headers: " + str(web.ctx.environ))
+        ssslog.debug("DELETE on Media Resource (remove content, leave container); Incoming HTTP headers: %s", web.ctx.environ)
         
         # find out if delete is allowed
-        cfg = global_configuration
-        if not cfg.allow_delete:
+        if not ALLOW_DELETE:
             spec = SWORDSpec()
             ss = SWORDServer()
             error = ss.sword_error(spec.error_method_not_allowed_uri, "Delete operations not currently permitted")
@@ -596,9 +616,7 @@ class MediaResource(MediaResourceContent):
 
         # if there was an error, report it, otherwise return the deposit receipt
         if result.error_code is not None:
-            web.header("Content-Type", "text/xml")
-            web.ctx.status = result.error_code
-            return result.error
+            return self._respond_error(result.error_code, result.error)
         else:
             web.ctx.status = "204 No Content" # No Content
             return
@@ -610,11 +628,10 @@ class MediaResource(MediaResourceContent):
         - id:   The ID of the media resource as specified in the requested URL
         Returns a Deposit Receipt
         """
-        ssslog.debug("POST to Media Resource (add new file); Incoming HTTP headers: " + str(web.ctx.environ))
+        ssslog.debug("POST to Media Resource (add new file); Incoming HTTP headers: %s", web.ctx.environ)
         
         # find out if update is allowed
-        cfg = global_configuration
-        if not cfg.allow_update:
+        if not ALLOW_UPDATE:
             spec = SWORDSpec()
             ss = SWORDServer()
             error = ss.sword_error(spec.error_method_not_allowed_uri, "Update operations not currently permitted")
@@ -663,21 +680,14 @@ class MediaResource(MediaResourceContent):
         if result is None:
             return web.notfound()
 
-        cfg = global_configuration
-
         # created, accepted, or error
         if result.created:
-            web.header("Content-Type", "application/atom+xml;type=entry")
-            web.header("Location", result.location)
-            web.ctx.status = "201 Created"
-            if cfg.return_deposit_receipt:
-                return result.receipt
+            if RETURN_DEPOSIT_RECEIPT:
+                return self._respond_atom("201 Created", result.location, result.receipt)
             else:
-                return
+                return self._respond_atom("201 Created", result.location, None)
         else:
-            web.header("Content-Type", "text/xml")
-            web.ctx.status = result.error_code
-            return result.error
+            return self._respond_error(result.error_code, result.error)
 
 class Container(SwordHttpHandler):
     """
@@ -693,7 +703,7 @@ class Container(SwordHttpHandler):
         Returns a representation of the container: SSS will return either the Atom Entry identical to the one supplied
         as a deposit receipt or the pure RDF/XML Statement depending on the Accept header
         """
-        ssslog.debug("GET on Container (retrieve deposit receipt or statement); Incoming HTTP headers: " + str(web.ctx.environ))
+        ssslog.debug("GET on Container (retrieve deposit receipt or statement); Incoming HTTP headers: %s", web.ctx.environ)
         
         # authenticate
         auth = self.authenticate(web)
@@ -750,11 +760,10 @@ class Container(SwordHttpHandler):
         PUT a new Entry over the existing entry, or a multipart request over
         both the existing metadata and the existing content
         """
-        ssslog.debug("PUT on Container (replace); Incoming HTTP headers: " + str(web.ctx.environ))
+        ssslog.debug("PUT on Container (replace); Incoming HTTP headers: %s", web.ctx.environ)
         
         # find out if update is allowed
-        cfg = global_configuration
-        if not cfg.allow_update:
+        if not ALLOW_UPDATE:
             spec = SWORDSpec()
             ss = SWORDServer()
             error = ss.sword_error(spec.error_method_not_allowed_uri, "Update operations not currently permitted")
@@ -805,18 +814,14 @@ class Container(SwordHttpHandler):
 
         # created, accepted, or error
         if result.created:
-            web.header("Location", result.location)
-            if cfg.return_deposit_receipt:
-                web.header("Content-Type", "application/atom+xml;type=entry")
-                web.ctx.status = "200 OK"
-                return result.receipt
+            if RETURN_DEPOSIT_RECEIPT:
+                return self._respond_atom("200 OK", result.location, result.receipt)
             else:
+                web.header("Location", result.location)
                 web.ctx.status = "204 No Content"
                 return
         else:
-            web.header("Content-Type", "text/xml")
-            web.ctx.status = result.error_code
-            return result.error
+            return self._respond_error(result.error_code, result.error)
 
     # NOTE: this POST action on the Container is represented in the specification
     # by a POST to the SE-IRI (The SWORD Edit IRI), sections 6.7.2 and 6.7.3 and
@@ -829,11 +834,10 @@ class Container(SwordHttpHandler):
         - id:    The ID of the container as contained in the URL
         Returns a Deposit Receipt
         """
-        ssslog.debug("POST to Container (add new content and metadata); Incoming HTTP headers: " + str(web.ctx.environ))
+        ssslog.debug("POST to Container (add new content and metadata); Incoming HTTP headers: %s", web.ctx.environ)
         
         # find out if update is allowed
-        cfg = global_configuration
-        if not cfg.allow_update:
+        if not ALLOW_UPDATE:
             spec = SWORDSpec()
             ss = SWORDServer()
             error = ss.sword_error(spec.error_method_not_allowed_uri, "Update operations not currently permitted")
@@ -885,17 +889,14 @@ class Container(SwordHttpHandler):
         
         # created, accepted or error
         if result.created:
-            web.header("Location", result.location)
-            web.ctx.status = "200 OK"
-            if cfg.return_deposit_receipt:
-                web.header("Content-Type", "application/atom+xml;type=entry")
-                return result.receipt
+            if RETURN_DEPOSIT_RECEIPT:
+                return self._respond_atom("200 OK", result.location, result.receipt)
             else:
+                web.header("Location", result.location)
+                web.ctx.status = "200 OK"
                 return
         else:
-            web.header("Content-Type", "text/xml")
-            web.ctx.status = result.error_code
-            return result.error
+            return self._respond_error(result.error_code, result.error)
 
     def DELETE(self, id):
         """
@@ -904,11 +905,10 @@ class Container(SwordHttpHandler):
         - id:   the ID of the container
         Returns nothing, as there is nothing to return (204 No Content)
         """
-        ssslog.debug("DELETE on Container (remove); Incoming HTTP headers: " + str(web.ctx.environ))
+        ssslog.debug("DELETE on Container (remove); Incoming HTTP headers: %s", web.ctx.environ)
         
         # find out if update is allowed
-        cfg = global_configuration
-        if not cfg.allow_delete:
+        if not ALLOW_DELETE:
             spec = SWORDSpec()
             ss = SWORDServer()
             error = ss.sword_error(spec.error_method_not_allowed_uri, "Delete operations not currently permitted")
@@ -951,16 +951,14 @@ class Container(SwordHttpHandler):
 
         # if there was an error, report it, otherwise return the deposit receipt
         if result.error_code is not None:
-            web.header("Content-Type", "text/xml")
-            web.ctx.status = result.error_code
-            return result.error
+            return self._respond_error(result.error_code, result.error)
         else:
             web.ctx.status = "204 No Content"
             return
 
 class StatementHandler(SwordHttpHandler):
     def GET(self, id):
-        ssslog.debug("GET on Statement (retrieve); Incoming HTTP headers: " + str(web.ctx.environ))
+        ssslog.debug("GET on Statement (retrieve); Incoming HTTP headers: %s", web.ctx.environ)
         
         # authenticate
         auth = self.authenticate(web)
@@ -1061,6 +1059,8 @@ class ContentType(object):
     """
     Class to represent a content type requested through content negotiation
     """
+    __slots__ = ("type", "subtype", "params", "packaging")
+
     def __init__(self, type=None, subtype=None, params=None, packaging=None):
         """
         Properties:
@@ -1127,7 +1127,16 @@ class ContentType(object):
         return tmatch and smatch and pmatch and packmatch
 
     def __eq__(self, other):
-        return self.media_format() == other.media_format()
+        # compare the same properties that make up the media_format(), without building the strings
+        return isinstance(other, ContentType) and \
+            (self.type, self.subtype, self.params, self.packaging) == (other.type, other.subtype, other.params, other.packaging)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        # equal content types must hash equally, so that they can be used in sets and as dictionary keys
+        return hash((self.type, self.subtype, self.params, self.packaging))
 
     def __str__(self):
         return self.media_format()
@@ -1154,30 +1163,29 @@ class ContentNegotiator(object):
         self.default_params = None
         self.default_packaging = None
 
-    def get_accept(self, dict):
+    def get_accept(self, env):
         """
         Get the Accept header out of the web.py HTTP dictionary.  Return None if no accept header exists
         """
-        if dict.has_key("HTTP_ACCEPT"):
-            return dict["HTTP_ACCEPT"]
-        return None
+        return env.get("HTTP_ACCEPT")
 
-    def get_packaging(self, dict):
-        if dict.has_key('HTTP_ACCEPT_PACKAGING'):
-            return dict['HTTP_ACCEPT_PACKAGING']
-        return None
+    def get_packaging(self, env):
+        return env.get("HTTP_ACCEPT_PACKAGING")
 
     def analyse_accept(self, accept, packaging=None):
         # FIXME: we need to somehow handle q=0.0 in here and in other related methods
         """
-        Analyse the Accept header string from the HTTP headers and return a structured dictionary with each
-        content types grouped by their common q values, thus:
+        Analyse the Accept header string from the HTTP headers and return a list of (q, ContentType) tuples, sorted
+        with the highest q value first, thus:
 
-        dict = {
-            1.0 : [<ContentType>, <ContentType>],
-            0.8 : [<ContentType],
-            0.5 : [<ContentType>, <ContentType>]
-        }
+        list = [
+            (1.0, <ContentType>),
+            (1.0, <ContentType>),
+            (0.8, <ContentType>),
+            (0.5, <ContentType>)
+        ]
+
+        Content types with the same q value appear in the order they were listed in the Accept header.
 
         This method will guarantee that ever content type has some q value associated with it, even if this was not
         supplied in the original Accept header; it will be inferred based on the rules of content negotiation
@@ -1203,11 +1211,11 @@ class ContentNegotiator(object):
             # the first part is always the type (see above comment)
             type = components[0].strip()
 
-            # create some default values for the other parts.  If there is no params, we will use None, if there is
-            # no q we will use a negative number multiplied by the position in the list of this part.  This allows us
-            # to later see the order in which the parts with no q value were listed, which is important
+            # create some default values for the other parts.  If there is no params or no q, we will use None.  We
+            # also record the position in the list of this part, which allows us to later see the order in which the
+            # parts with no q value were listed, which is important
             params = None
-            q = -1 * counter
+            q = None
 
             # There are then 3 possibilities remaining to check for: "type;q", "type;params" and "type;params;q"
             # ("type" is already handled by the default cases set up above)
@@ -1215,24 +1223,24 @@ class ContentNegotiator(object):
                 # "type;q" or "type;params"
                 if components[1].strip().startswith("q="):
                     # "type;q"
-                    q = components[1].strip()[2:] # strip the "q=" from the start of the q value
+                    q = float(components[1].strip()[2:]) # strip the "q=" from the start of the q value
                     # if the q value is the highest one we've seen so far, record it
-                    if float(q) > highest_q:
-                        highest_q = float(q)
+                    if q > highest_q:
+                        highest_q = q
                 else:
                     # "type;params"
                     params = components[1].strip()
             elif len(components) == 3:
                 # "type;params;q"
                 params = components[1].strip()
-                q = components[1].strip()[2:] # strip the "q=" from the start of the q value
+                q = float(components[2].strip()[2:]) # strip the "q=" from the start of the q value
                 # if the q value is the highest one we've seen so far, record it
-                if float(q) > highest_q:
-                    highest_q = float(q)
+                if q > highest_q:
+                    highest_q = q
 
             # at the end of the analysis we have all of the components with or without their default values, so we
             # just record the analysed version for the time being as a tuple in the unsorted array
-            unsorted.append((type, params, q))
+            unsorted.append((type, params, q, counter))
 
         # once we've finished the analysis we'll know what the highest explicitly requested q will be.  This may leave
         # us with a gap between 1.0 and the highest requested q, into which we will want to put the content types which
@@ -1240,37 +1248,27 @@ class ContentNegotiator(object):
         # later on in positioning those elements.  Note that the gap may be 0.0.
         q_range = 1.0 - highest_q
 
-        # set up a dictionary to hold our sorted results.  The dictionary will be keyed with the q value, and the
-        # value of each key will be an array of ContentType objects (in no particular order)
-        sorted = {}
+        # set up a flat list to hold our results as (q, ContentType) tuples; we sort it once at the end
+        analysed = []
 
         # go through the unsorted list
-        for (type, params, q) in unsorted:
+        for (type, params, q, position) in unsorted:
             # break the type into super and sub types for the ContentType constructor
             supertype, subtype = type.split("/", 1)
-            if q > 0:
-                # if the q value is greater than 0 it was explicitly assigned in the Accept header and we can just place
-                # it into the sorted dictionary
-                self.insert(sorted, q, ContentType(supertype, subtype, params, packaging))
+            if q is not None:
+                # if the q value was explicitly assigned in the Accept header we can just place it into the list
+                analysed.append((q, ContentType(supertype, subtype, params, packaging)))
             else:
                 # otherwise, we have to calculate the q value using the following equation which creates a q value "qv"
-                # within "q_range" of 1.0 [the first part of the eqn] based on the fraction of the way through the total
-                # accept header list scaled by the q_range [the second part of the eqn]
-                qv = (1.0 - q_range) + (((-1 * q)/counter) * q_range)
-                self.insert(sorted, qv, ContentType(supertype, subtype, params, packaging))
+                # within "q_range" of 1.0 [the first part of the eqn] based on the position in the accept header list,
+                # so that earlier entries get more of the q_range than later ones [the second part of the eqn]
+                qv = (1.0 - q_range) + (q_range / position)
+                analysed.append((qv, ContentType(supertype, subtype, params, packaging)))
 
-        # now we have a dictionary keyed by q value which we can return
-        return sorted
-
-    def insert(self, d, q, v):
-        """
-        Utility method: if dict d contains key q, then append value v to the array which is identified by that key
-        otherwise create a new key with the value of an array with a single value v
-        """
-        if d.has_key(q):
-            d[q].append(v)
-        else:
-            d[q] = [v]
+        # sort with the highest q first.  The sort is stable, so content types with the same q value stay in the
+        # order in which the client listed them
+        analysed.sort(key=lambda x: -x[0])
+        return analysed
 
     def contains_match(self, source, target):
         """
@@ -1301,20 +1299,17 @@ class ContentNegotiator(object):
         be reached.
         """
 
-        # get the client requirement keys sorted with the highest q first (the server is a list which should be
+        # the client requirements are already sorted with the highest q first (the server is a list which should be
         # in order of preference already)
-        ckeys = client.keys()
-        ckeys.sort(reverse=True)
 
         # the rule for determining what to return is that "the client's preference always wins", so we look for the
         # highest q ranked item that the server is capable of returning.  We only take into account the server's
         # preference when the client has two equally weighted preferences - in that case we take the server's
         # preferred content type
-        for q in ckeys:
+        for q, group in groupby(client, key=lambda x: x[0]):
             # for each q in order starting at the highest
-            possibilities = client[q]
             allowable = []
-            for p in possibilities:
+            for (_, p) in group:
                 # for each content type with the same q value
 
                 # find out if the possibility p matches anything in the server.  This uses the ContentType's
@@ -1336,18 +1331,19 @@ class ContentNegotiator(object):
             else:
                 # we found multiple supported content types at this q value, so now we need to choose the server's
                 # preference
-                for i in range(len(server)):
-                    # iterate through the server explicitly by numerical position
-                    if server[i] in allowable:
+                allowable = set(allowable)
+                for s in server:
+                    # iterate through the server in order of preference
+                    if s in allowable:
                         # when we find our first content type in the allowable list, it is the highest ranked server content
                         # type that is allowable, so this is our type
-                        return server[i]
+                        return s
 
         # we've got to here without returning anything, which means that the client and server can't come to
         # an agreement on what content type they want and can deliver.  There's nothing more we can do!
         return None
 
-    def negotiate(self, dict):
+    def negotiate(self, env):
         """
         Main method for carrying out content negotiation over the supplied HTTP headers dictionary.
         Returns either the preferred ContentType as per the settings of the object, or None if no agreement could be
@@ -1357,8 +1353,8 @@ class ContentNegotiator(object):
                         ";" + str(self.default_params) + " and Accept-Packaging: " + str(self.default_packaging))
         
         # get the accept header if available
-        accept = self.get_accept(dict)
-        packaging = self.get_packaging(dict)
+        accept = self.get_accept(env)
+        packaging = self.get_packaging(env)
         ssslog.debug("Accept Header: " + str(accept))
         ssslog.debug("Packaging: "+ str(packaging))
 
@@ -1376,7 +1372,7 @@ class ContentNegotiator(object):
         
         ssslog.debug("Negotiating on Accept: " + str(accept) + " and Accept-Packaging: " + str(packaging))
         
-        # get us back a dictionary keyed by q value which tells us the order of preference that the client has
+        # get us back a list of (q, ContentType) tuples which tells us the order of preference that the client has
         # requested
         analysed = self.analyse_accept(accept, packaging)
 
@@ -1396,6 +1392,8 @@ class ContentNegotiator(object):
 # them to exchange messages agnostically to the interface
 
 class Auth(object):
+    __slots__ = ("by", "obo", "target_owner_unknown")
+
     def __init__(self, by=None, obo=None, target_owner_unknown=False):
         self.by = by
         self.obo = obo
@@ -1404,10 +1402,29 @@ class Auth(object):
     def success(self):
         return self.by is not None and not self.target_owner_unknown
 
+def _auth_tuple(auth):
+    """
+    the (by, obo) pair for the supplied Auth object, or (None, None) if there is no Auth object.  The HTTP handlers
+    always authenticate to an Auth object, but a request's auth is None until one is attached (SWORDRequest starts it
+    as None, and get_deposit and get_delete take it as optional), so that case is handled here
+    """
+    if auth is None:
+        return None, None
+    return auth.by, auth.obo
+
+def _timestamp(d):
+    """
+    Format the supplied datetime as YYYY-MM-DDTHH:MM:SSZ.  This is the only date format we ever write, so build it
+    directly rather than going through strftime
+    """
+    return "%04d-%02d-%02dT%02d:%02d:%02dZ" % (d.year, d.month, d.day, d.hour, d.minute, d.second)
+
 class SWORDRequest(object):
     """
     General class to represent any sword request (such as deposit or delete)
     """
+    __slots__ = ("on_behalf_of", "packaging", "in_progress", "metadata_relevant", "auth", "content_md5", "slug")
+
     def __init__(self):
         """
         There are 4 HTTP sourced properties:
@@ -1415,6 +1432,7 @@ class SWORDRequest(object):
         - packaging     - Packaging in HTTP; the packaging format being used
         - in_progress   - In-Progress in HTTP; whether the deposit is complete or not from a client perspective
         - metadata_relevant - Metadata-Relevant; whether or not the deposit contains relevant metadata
+        in_progress and metadata_relevant are held as booleans; set_by_header converts the "true"/"false" header values
         """
 
         self.on_behalf_of = None
@@ -1432,7 +1450,7 @@ class SWORDRequest(object):
         here is the web.py format which is all upper case, preceeding with HTTP_ with all - converted to _
         (for some unknown reason)
         """
-        ssslog.debug("Setting Header %s : %s" % (key, value))
+        ssslog.debug("Setting Header %s : %s", key, value)
         if key == "HTTP_ON_BEHALF_OF":
             self.on_behalf_of = value
         elif key == "HTTP_PACKAGING" and value is not None:
@@ -1450,6 +1468,8 @@ class DepositRequest(SWORDRequest):
     """
     Class to represent a request to deposit some content onto the server
     """
+    __slots__ = ("content_type", "content", "atom", "filename", "too_large")
+
     def __init__(self):
         """
         There are 3 content related properties:
@@ -1470,6 +1490,8 @@ class DepositResponse(object):
     """
     Class to represent the response to a deposit request
     """
+    __slots__ = ("created", "accepted", "error_code", "error", "receipt", "location")
+
     def __init__(self):
         """
         Properties:
@@ -1491,6 +1513,8 @@ class MediaResourceResponse(object):
     """
     Class to represent the response to a request to retrieve the Media Resource
     """
+    __slots__ = ("redirect", "url", "filepath", "packaging")
+
     def __init__(self):
         """
         There are three properties:
@@ -1507,6 +1531,8 @@ class DeleteRequest(SWORDRequest):
     """
     Class Representing a request to delete either the content or the container itself.
     """
+    __slots__ = ()
+
     def __init__(self):
         """
         The properties of this class are as per SWORDRequest
@@ -1517,6 +1543,8 @@ class DeleteResponse(object):
     """
     Class to represent the response to a request to delete the content or the container
     """
+    __slots__ = ("error_code", "error", "receipt")
+
     def __init__(self):
         """
         There are 3 properties:
@@ -1539,13 +1567,25 @@ class SWORDSpec(object):
     the entities with which SWORD works.  The jury is out, in my mind, whether this class is a useful separation, but
     for what it's worth, here it is ...
     """
+
+    # the filename parameter of a Content-Disposition header, with or without quotes.  Parameter names are case
+    # insensitive, and must start a parameter so that a name which merely ends in "filename" is not picked up
+    filename_regex = re.compile(r'(?:^|;)\s*filename\s*=\s*"?([^";]+)"?', re.IGNORECASE)
+
+    # how much of a spooled multipart payload to read and decode at a time
+    payload_block_size = 1 << 16
+
+    # the permitted values of the In-Progress and Metadata-Relevant headers, including None for when they are absent
+    boolean_header_values = frozenset([None, "true", "false"])
+
     def __init__(self):
         # The HTTP headers that are part of the specification (from a web.py perspective - don't be fooled, these
-        # aren't the real HTTP header names - see the spec)
-        self.sword_headers = [
+        # aren't the real HTTP header names - see the spec).  This is a set so that we can pick them out of the
+        # request headers with a single intersection
+        self.sword_headers = frozenset([
             "HTTP_ON_BEHALF_OF", "HTTP_PACKAGING", "HTTP_IN_PROGRESS", "HTTP_METADATA_RELEVANT",
             "HTTP_CONTENT_MD5", "HTTP_SLUG", "HTTP_ACCEPT_PACKAGING"
-        ]
+        ])
 
         self.error_content_uri = "http://purl.org/net/sword/error/ErrorContent"
         self.error_checksum_mismatch_uri = "http://purl.org/net/sword/error/ErrorChecksumMismatch"
@@ -1556,19 +1596,17 @@ class SWORDSpec(object):
         self.error_max_upload_size_exceeded = "http://purl.org/net/sword/error/MaxUploadSizeExceeded"
 
     def validate_deposit_request(self, web, allow_multipart=True):
-        dict = web.ctx.environ
+        env = web.ctx.environ
 
         # get each of the allowed SWORD headers that can be validated and see if they do
-        ip = dict.get("HTTP_IN_PROGRESS")
-        if ip is not None and ip != "true" and ip != "false":
+        if env.get("HTTP_IN_PROGRESS") not in self.boolean_header_values:
             return "In-Progress must be 'true' or 'false'"
 
-        sm = dict.get("HTTP_METADATA_RELEVANT")
-        if sm is not None and sm != "true" and sm != "false":
+        if env.get("HTTP_METADATA_RELEVANT") not in self.boolean_header_values:
             return "Metadata-Relevant must be 'true' or 'false'"
 
         # there must be both an "atom" and "payload" input or data in web.data()
-        webin = web.input()
+        webin = self.get_multipart_input(web)
         if len(webin) != 2 and len(webin) > 0:
             return "Multipart request does not contain exactly 2 parts"
         if len(webin) >= 2 and not webin.has_key("atom") and not webin.has_key("payload"):
@@ -1585,15 +1623,13 @@ class SWORDSpec(object):
         return None
 
     def validate_delete_request(self, web):
-        dict = web.ctx.environ
+        env = web.ctx.environ
 
         # get each of the allowed SWORD headers that can be validated and see if they do
-        ip = dict.get("HTTP_IN_PROGRESS")
-        if ip is not None and ip != "true" and ip != "false":
+        if env.get("HTTP_IN_PROGRESS") not in self.boolean_header_values:
             return "In-Progress must be 'true' or 'false'"
 
-        sm = dict.get("HTTP_METADATA_RELEVANT")
-        if sm is not None and sm != "true" and sm != "false":
+        if env.get("HTTP_METADATA_RELEVANT") not in self.boolean_header_values:
             return "Metadata-Relevant must be 'true' or 'false'"
         
         # validates
@@ -1611,41 +1647,46 @@ class SWORDSpec(object):
         d = DepositRequest()
 
         # now go through the headers and populate the Deposit object
-        dict = web.ctx.environ
+        env = web.ctx.environ
 
         # get the headers that have been provided.  Any headers which have not been provided have default values
-        # supplied in the DepositRequest object's constructor
-        ssslog.debug("Incoming HTTP headers: " + str(dict))
+        # supplied in the DepositRequest object's constructor.  (The HTTP handlers have already logged the full set of
+        # incoming headers, so we don't do it again here)
         empty_request = False
-        for head in dict.keys():
-            if head in self.sword_headers:
-                d.set_by_header(head, dict[head])
-            if head == "HTTP_CONTENT_DISPOSITION":
-                ssslog.debug("Reading Header %s : %s" % (head, dict[head]))
-                d.filename = self.extract_filename(dict[head])
-                ssslog.debug("Extracted filename %s from %s" % (d.filename, dict[head]))
-            if head == "CONTENT_TYPE":
-                ssslog.debug("Reading Header %s : %s" % (head, dict[head]))
-                ct = dict[head]
-                d.content_type = ct
-                if ct.startswith("application/atom+xml"):
-                    atom_only = True
-            if head == "CONTENT_LENGTH":
-                ssslog.debug("Reading Header %s : %s" % (head, dict[head]))
-                if dict[head] == "0":
-                    empty_request = True
-                cl = int(dict[head]) # content length as an integer
-                if cl > global_configuration.max_upload_size:
-                    d.too_large = True
-                    return d
+        for head in self.sword_headers.intersection(env):
+            d.set_by_header(head, env[head])
+
+        cd = env.get("HTTP_CONTENT_DISPOSITION")
+        if cd is not None:
+            ssslog.debug("Reading Header %s : %s", "HTTP_CONTENT_DISPOSITION", cd)
+            filename = self.extract_filename(cd)
+            if filename is not None:
+                d.filename = filename
+            ssslog.debug("Extracted filename %s from %s", d.filename, cd)
+
+        ct = env.get("CONTENT_TYPE")
+        if ct is not None:
+            ssslog.debug("Reading Header %s : %s", "CONTENT_TYPE", ct)
+            d.content_type = ct
+            if ct.startswith("application/atom+xml"):
+                atom_only = True
+
+        cl = env.get("CONTENT_LENGTH")
+        if cl is not None:
+            ssslog.debug("Reading Header %s : %s", "CONTENT_LENGTH", cl)
+            if cl == "0":
+                empty_request = True
+            if int(cl) > global_configuration.max_upload_size: # content length as an integer
+                d.too_large = True
+                return d
 
         # first we need to find out if this is a multipart or not
-        webin = web.input()
+        webin = self.get_multipart_input(web)
         if len(webin) == 2:
             ssslog.info("Received multipart deposit request")
             d.atom = webin['atom']
-            # read the zip file from the base64 encoded string
-            d.content = base64.decodestring(webin['payload'])
+            # read the zip file from the base64 encoded payload
+            d.content = self.decode_payload(webin['payload'])
         elif not empty_request:
             # if this wasn't a multipart, and isn't an empty request, then the data is in web.data().  This could be a binary deposit or
             # an atom entry deposit - reply on the passed/determined argument to determine which
@@ -1660,13 +1701,55 @@ class SWORDSpec(object):
         d.auth = auth
         return d
 
+    def get_multipart_input(self, web):
+        """
+        Get the parts of a multipart request from web.py, or an empty dictionary if the request is not multipart.  For
+        anything else web.input() would copy the whole body into a FieldStorage just to find that it has no parts, so
+        we only call it when the Content-Type says multipart
+        """
+        if not web.ctx.environ.get("CONTENT_TYPE", "").lower().startswith("multipart/"):
+            return {}
+        # asking for the payload with a dictionary default makes web.py give us the part itself rather than its value,
+        # so that get_deposit can decode it from the temporary file it has been written to.  If there was no payload
+        # part then web.py fills in the default, which must not be counted as one of the parts of the request
+        webin = web.input(payload={})
+        if isinstance(webin["payload"], dict):
+            del webin["payload"]
+        return webin
+
+    def decode_payload(self, payload):
+        """
+        Decode the base64 encoded payload part of a multipart request.  A part sent with a filename has been spooled to
+        a temporary file by cgi, so decode it from there a block at a time rather than reading the whole of the encoded
+        text into memory first
+        """
+        if not hasattr(payload, "file"):
+            return binascii.a2b_base64(payload)
+
+        # the encoded text may be wrapped at any width, so the line breaks are taken out of each block and only whole
+        # 4 character groups are decoded; whatever is left over is carried on to the front of the next block
+        decoded = io.BytesIO()
+        leftover = ""
+        while True:
+            block = payload.file.read(self.payload_block_size)
+            if not block:
+                break
+            block = leftover + block.translate(None, " \t\r\n\v\f")
+            usable = len(block) - len(block) % 4
+            decoded.write(binascii.a2b_base64(block[:usable]))
+            leftover = block[usable:]
+        if leftover:
+            decoded.write(binascii.a2b_base64(leftover))
+        return decoded.getvalue()
+
     def extract_filename(self, cd):
-        """ get the filename out of the content disposition header """
-        # ok, this is a bit obtuse, but it was fun making it.  It's not hard to understand really, if you break
-        # it down
-        return cd[cd.find("filename=") + len("filename="):cd.find(";", cd.find("filename=")) if cd.find(";", cd.find("filename=")) > -1 else len(cd)]
+        """ get the filename out of the content disposition header, or None if there isn't one """
+        m = self.filename_regex.search(cd)
+        if m is None:
+            return None
+        return m.group(1)
 
-    def get_delete(self, dict, auth=None):
+    def get_delete(self, env, auth=None):
         """
         Take a web.py web object and extract from it the parameters and content required for a SWORD delete request.
         It mainly extracts the HTTP headers which are relevant to delete, and for those not supplied provides thier
@@ -1675,19 +1758,86 @@ class SWORDSpec(object):
         d = DeleteRequest()
 
         # we just want to parse out the headers that are relevant
-        for head in dict.keys():
-            if head in self.sword_headers:
-                d.set_by_header(head, dict[head])
+        for head in self.sword_headers.intersection(env):
+            d.set_by_header(head, env[head])
 
         # now just attach the authentication data and return
         d.auth = auth
         return d
 
+# SWORDSpec holds no per-request state, so the SWORDServer error checks share this one rather than each server
+# building its own
+_SPEC = SWORDSpec()
+
 class SWORDServer(object):
     """
     The main SWORD Server class.  This class deals with all the CRUD requests as provided by the web.py HTTP
     handlers
     """
+
+    # serialised sword error documents, keyed by (uri, msg), with a placeholder where the updated date goes.  The
+    # same handful of errors get generated over and over, so we only build the XML once for each of them
+    error_templates = {}
+    error_templates_max = 32
+    error_updated_marker = "@@SSS_ERROR_UPDATED@@"
+
+    # the metadata values to use in the deposit receipt where the item does not supply its own
+    receipt_metadata_defaults = {
+        "title" : ["SWORD Deposit"],
+        "creator" : ["SWORD Client"],
+        "abstract" : ["Content deposited with SWORD client"]
+    }
+
+    # the service document only changes if the set of collections does, so we keep the last serialised copy for each
+    # use_sub value, as a (collection names, document) pair
+    service_documents = {}
+
+    # the pre-built parts of the deposit receipt which are the same for every item, along with the positions of the
+    # elements in it which are filled in for each item, as an (entry, slots) pair
+    receipt_template = None
+
+    # Clark notation names for the elements used in the service document, collection feed and deposit receipt.  These
+    # never change, so we work them out once here rather than joining the namespace and local name on every request
+    _ns = Namespaces()
+    APP_SERVICE = _ns.APP + "service"
+    APP_WORKSPACE = _ns.APP + "workspace"
+    APP_COLLECTION = _ns.APP + "collection"
+    APP_ACCEPT = _ns.APP + "accept"
+
+    ATOM_FEED = _ns.ATOM + "feed"
+    ATOM_ENTRY = _ns.ATOM + "entry"
+    ATOM_TITLE = _ns.ATOM + "title"
+    ATOM_ID = _ns.ATOM + "id"
+    ATOM_UPDATED = _ns.ATOM + "updated"
+    ATOM_AUTHOR = _ns.ATOM + "author"
+    ATOM_NAME = _ns.ATOM + "name"
+    ATOM_SUMMARY = _ns.ATOM + "summary"
+    ATOM_GENERATOR = _ns.ATOM + "generator"
+    ATOM_LINK = _ns.ATOM + "link"
+    ATOM_CONTENT = _ns.ATOM + "content"
+
+    SWORD_VERSION = _ns.SWORD + "version"
+    SWORD_MAX_UPLOAD_SIZE = _ns.SWORD + "maxUploadSize"
+    SWORD_COLLECTION_POLICY = _ns.SWORD + "collectionPolicy"
+    SWORD_MEDIATION = _ns.SWORD + "mediation"
+    SWORD_TREATMENT = _ns.SWORD + "treatment"
+    SWORD_ACCEPT_PACKAGING = _ns.SWORD + "acceptPackaging"
+    SWORD_SERVICE = _ns.SWORD + "service"
+    SWORD_VERBOSE_DESCRIPTION = _ns.SWORD + "verboseDescription"
+    SWORD_PACKAGING = _ns.SWORD + "packaging"
+    SWORD_ERROR = _ns.SWORD + "error"
+
+    DC_ABSTRACT = _ns.DC + "abstract"
+
+    # the namespace maps that we will use during serialisation.  These are shared by every SWORDServer (which is
+    # created once per request) and must not be modified
+    sdmap = {None : _ns.APP_NS, "sword" : _ns.SWORD_NS, "atom" : _ns.ATOM_NS, "dcterms" : _ns.DC_NS}
+    cmap = {None: _ns.ATOM_NS}
+    drmap = {None: _ns.ATOM_NS, "sword" : _ns.SWORD_NS, "dcterms" : _ns.DC_NS}
+    smap = {"rdf" : _ns.RDF_NS, "ore" : _ns.ORE_NS, "sword" : _ns.SWORD_NS}
+    emap = {"sword" : _ns.SWORD_NS, "atom" : _ns.ATOM_NS}
+    del _ns
+
     def __init__(self):
 
         # get the configuration
@@ -1702,118 +1852,175 @@ class SWORDServer(object):
         # create a URIManager for us to use
         self.um = URIManager()
 
-        # build the namespace maps that we will use during serialisation
-        self.sdmap = {None : self.ns.APP_NS, "sword" : self.ns.SWORD_NS, "atom" : self.ns.ATOM_NS, "dcterms" : self.ns.DC_NS}
-        self.cmap = {None: self.ns.ATOM_NS}
-        self.drmap = {None: self.ns.ATOM_NS, "sword" : self.ns.SWORD_NS, "dcterms" : self.ns.DC_NS}
-        self.smap = {"rdf" : self.ns.RDF_NS, "ore" : self.ns.ORE_NS, "sword" : self.ns.SWORD_NS}
-        self.emap = {"sword" : self.ns.SWORD_NS, "atom" : self.ns.ATOM_NS}
-
     def exists(self, oid):
         """
         Does the specified object id exist?
         """
+        # container_exists is false if the collection is missing too, so one check on the container path is enough
         collection, id = oid.split("/", 1)
-        return self.dao.collection_exists(collection) and self.dao.container_exists(collection, id)
+        return self.dao.container_exists(collection, id)
 
     def service_document(self, use_sub=False):
         """
         Construct the Service Document.  This takes the set of collections that are in the store, and places them in
         an Atom Service document as the individual entries
         """
+        collections = self.dao.get_collection_names()
+        cached = self.service_documents.get(use_sub)
+        if cached is not None and cached[0] == collections:
+            return cached[1]
+
+        document = self._build_service_document(collections, use_sub)
+        SWORDServer.service_documents[use_sub] = (collections, document)
+        return document
+
+    def _build_service_document(self, collections, use_sub):
+        # everything except the collection href and title is the same for each collection, so we work out the
+        # contents of a collection element once and then create one for each collection from that
+        service = self._build_service_skeleton()
+        workspace = service.find(self.APP_WORKSPACE)
+        children = [(child.tag, child.text, dict(child.attrib)) for child in self._build_collection_template(use_sub)]
+
+        # now for each collection create a collection element.  The sub service document uris are made up here, so
+        # they stay the same for as long as this document is kept
+        for col in collections:
+            sub_uri = self.um.sd_uri(True) if use_sub else None
+            self._add_collection(workspace, col, children, sub_uri)
+
+        # serialise (pretty printed only if configured to) and return
+        return etree.tostring(service, pretty_print=self.configuration.pretty_print)
+
+    def _add_collection(self, workspace, col, children, sub_uri=None):
+        # The children are created directly under their parent rather than being copied in from another document,
+        # which would make lxml reconcile the namespaces
+        collection = etree.SubElement(workspace, self.APP_COLLECTION)
+        collection.set("href", self.um.col_uri(col))
+
+        for tag, text, attrib in children:
+            child = etree.SubElement(collection, tag, attrib)
+            child.text = text
+
+        # collection title (always the first child of the template)
+        collection[0].text = "Collection " + col
+
+        # the sub service document uri (always the last child of the template)
+        if sub_uri is not None:
+            collection[-1].text = sub_uri
+
+    def _build_service_skeleton(self):
         # Start by creating the root of the service document, supplying to it the namespace map in this first instance
-        service = etree.Element(self.ns.APP + "service", nsmap=self.sdmap)
+        service = etree.Element(self.APP_SERVICE, nsmap=self.sdmap)
 
         # version element
-        version = etree.SubElement(service, self.ns.SWORD + "version")
+        version = etree.SubElement(service, self.SWORD_VERSION)
         version.text = self.configuration.sword_version
 
         # max upload size
-        mus = etree.SubElement(service, self.ns.SWORD + "maxUploadSize")
+        mus = etree.SubElement(service, self.SWORD_MAX_UPLOAD_SIZE)
         mus.text = str(self.configuration.max_upload_size)
 
         # workspace element
-        workspace = etree.SubElement(service, self.ns.APP + "workspace")
+        workspace = etree.SubElement(service, self.APP_WORKSPACE)
 
         # title element
-        title = etree.SubElement(workspace, self.ns.ATOM + "title")
+        title = etree.SubElement(workspace, self.ATOM_TITLE)
         title.text = "Main Site"
 
-        # now for each collection create a collection element
-        for col in self.dao.get_collection_names():
-            collection = etree.SubElement(workspace, self.ns.APP + "collection")
-            collection.set("href", self.um.col_uri(col))
-
-            # collection title
-            ctitle = etree.SubElement(collection, self.ns.ATOM + "title")
-            ctitle.text = "Collection " + col
-
-            if not self.configuration.accept_nothing:
-                # accepts declaration
-                if self.configuration.app_accept is not None:
-                    for acc in self.configuration.app_accept:
-                        accepts = etree.SubElement(collection, self.ns.APP + "accept")
-                        accepts.text = acc
-                
-                if self.configuration.multipart_accept is not None:
-                    for acc in self.configuration.multipart_accept:
-                        mraccepts = etree.SubElement(collection, self.ns.APP + "accept")
-                        mraccepts.text = acc
-                        mraccepts.set("alternate", "multipart-related")
-            else:
-                accepts = etree.SubElement(collection, self.ns.APP + "accept")
+        return service
 
-            # SWORD collection policy
-            collectionPolicy = etree.SubElement(collection, self.ns.SWORD + "collectionPolicy")
-            collectionPolicy.text = "Collection Policy"
+    def _build_collection_template(self, use_sub):
+        # the collection element, with the same namespace map as the service document so that it can be added to it
+        collection = etree.Element(self.APP_COLLECTION, nsmap=self.sdmap)
 
-            # Collection abstract
-            abstract = etree.SubElement(collection, self.ns.DC + "abstract")
-            abstract.text = "Collection Description"
+        # collection title; the text is filled in for each collection
+        etree.SubElement(collection, self.ATOM_TITLE)
 
-            # support for mediation
-            mediation = etree.SubElement(collection, self.ns.SWORD + "mediation")
-            mediation.text = "true" if self.configuration.mediation else "false"
+        if not self.configuration.accept_nothing:
+            # accepts declaration
+            if self.configuration.app_accept is not None:
+                for acc in self.configuration.app_accept:
+                    accepts = etree.SubElement(collection, self.APP_ACCEPT)
+                    accepts.text = acc
+            
+            if self.configuration.multipart_accept is not None:
+                for acc in self.configuration.multipart_accept:
+                    mraccepts = etree.SubElement(collection, self.APP_ACCEPT)
+                    mraccepts.text = acc
+                    mraccepts.set("alternate", "multipart-related")
+        else:
+            accepts = etree.SubElement(collection, self.APP_ACCEPT)
+
+        # SWORD collection policy
+        collectionPolicy = etree.SubElement(collection, self.SWORD_COLLECTION_POLICY)
+        collectionPolicy.text = "Collection Policy"
+
+        # Collection abstract
+        abstract = etree.SubElement(collection, self.DC_ABSTRACT)
+        abstract.text = "Collection Description"
 
-            # treatment
-            treatment = etree.SubElement(collection, self.ns.SWORD + "treatment")
-            treatment.text = "Treatment description"
+        # support for mediation
+        mediation = etree.SubElement(collection, self.SWORD_MEDIATION)
+        mediation.text = "true" if self.configuration.mediation else "false"
+
+        # treatment
+        treatment = etree.SubElement(collection, self.SWORD_TREATMENT)
+        treatment.text = "Treatment description"
 
-            # SWORD packaging formats accepted
-            for format in self.configuration.sword_accept_package:
-                acceptPackaging = etree.SubElement(collection, self.ns.SWORD + "acceptPackaging")
-                acceptPackaging.text = format
+        # SWORD packaging formats accepted
+        for format in self.configuration.sword_accept_package:
+            acceptPackaging = etree.SubElement(collection, self.SWORD_ACCEPT_PACKAGING)
+            acceptPackaging.text = format
 
-            # provide a sub service element if appropriate
-            if use_sub:
-                subservice = etree.SubElement(collection, self.ns.SWORD + "service")
-                subservice.text = self.um.sd_uri(True)
+        # provide a sub service element if appropriate; the uri is filled in for each collection
+        if use_sub:
+            etree.SubElement(collection, self.SWORD_SERVICE)
 
-        # pretty print and return
-        return etree.tostring(service, pretty_print=True)
+        return collection
 
     def list_collection(self, id):
         """
         List the contents of a collection identified by the supplied id
         """
-        # create an empty feed element for the collection
-        feed = etree.Element(self.ns.ATOM + "feed", nsmap=self.cmap)
-
-        # if the collection path does not exist, then return the empty feed
+        # if the collection path does not exist, then we return an empty feed, otherwise list all of the containers
+        # in the collection
         cpath = os.path.join(self.configuration.store_dir, str(id))
-        if not os.path.exists(cpath):
-            return etree.tostring(feed, pretty_print=True)
+        parts = []
+        if os.path.exists(cpath):
+            parts = os.listdir(cpath)
+        edit_uris = (self.um.edit_uri(id, part) for part in parts)
+
+        # pretty printing needs the whole tree, but otherwise we write the feed out an entry at a time so that large
+        # collections never have to be held in memory as elements.  This stays on lxml like every other document: the
+        # standard library's cElementTree has no nsmap, so the atom namespace has to be faked on the root, and it
+        # turned out slower than streaming with lxml's xmlfile anyway
+        if self.configuration.pretty_print:
+            return self._list_collection_tree(edit_uris)
+        return self._list_collection_stream(edit_uris)
+
+    def _list_collection_tree(self, edit_uris):
+        # create an empty feed element for the collection
+        feed = etree.Element(self.ATOM_FEED, nsmap=self.cmap)
 
-        # list all of the containers in the collection
-        parts = os.listdir(cpath)
-        for part in parts:
-            entry = etree.SubElement(feed, self.ns.ATOM + "entry")
-            link = etree.SubElement(entry, self.ns.ATOM + "link")
+        for edit_uri in edit_uris:
+            entry = etree.SubElement(feed, self.ATOM_ENTRY)
+            link = etree.SubElement(entry, self.ATOM_LINK)
             link.set("rel", "edit")
-            link.set("href", self.um.edit_uri(id, part))
-
-        # pretty print and return
-        return etree.tostring(feed, pretty_print=True)
+            link.set("href", edit_uri)
+
+        # serialise (pretty printed only if configured to) and return
+        return etree.tostring(feed, pretty_print=self.configuration.pretty_print)
+
+    def _list_collection_stream(self, edit_uris):
+        # the entries and links are written with xf.element rather than as Elements, as a written Element would
+        # carry its own declaration of the atom namespace
+        buf = io.BytesIO()
+        with etree.xmlfile(buf) as xf:
+            with xf.element(self.ATOM_FEED, nsmap=self.cmap):
+                for edit_uri in edit_uris:
+                    with xf.element(self.ATOM_ENTRY):
+                        with xf.element(self.ATOM_LINK, rel="edit", href=edit_uri):
+                            pass
+        return buf.getvalue()
 
     def deposit_new(self, collection, deposit):
         """
@@ -1861,20 +2068,18 @@ class SWORDServer(object):
             # a list of identifiers which will resolve to the derived resources
             derived_resource_uris = self.get_derived_resource_uris(collection, id, derived_resources)
 
-        # the aggregation uri
-        agg_uri = self.um.agg_uri(collection, id)
-
-        # the Edit-URI
-        edit_uri = self.um.edit_uri(collection, id)
+        # all the identifiers for the container, including the aggregation uri and the Edit-URI
+        uris = self.um.build_all(collection, id)
+        agg_uri = uris.agg
+        edit_uri = uris.edit
 
         # create the initial statement
         s = Statement()
         s.aggregation_uri = agg_uri
         s.rem_uri = edit_uri
-        by = deposit.auth.by if deposit.auth is not None else None
-        obo = deposit.auth.obo if deposit.auth is not None else None
+        by, obo = _auth_tuple(deposit.auth)
         if deposit_uri is not None:
-            s.original_deposit(deposit_uri, datetime.now(), deposit.packaging, by, obo)
+            s.original_deposit(deposit_uri, datetime.utcnow(), deposit.packaging, by, obo)
         s.in_progress = deposit.in_progress
         s.aggregates = derived_resource_uris
 
@@ -1883,7 +2088,7 @@ class SWORDServer(object):
 
         # create the basic deposit receipt (which involves getting hold of the item's metadata first if it exists)
         metadata = self.dao.get_metadata(collection, id)
-        receipt = self.deposit_receipt(collection, id, deposit, s, metadata)
+        receipt = self.deposit_receipt(collection, id, deposit, s, metadata, uris)
 
         # store the deposit receipt
         self.dao.store_deposit_receipt(collection, id, receipt)
@@ -1908,7 +2113,7 @@ class SWORDServer(object):
         collection, id, fn = self.um.interpret_path(path)
         if self.dao.file_exists(collection, id, fn):
             route = self.dao.get_store_path(collection, id, fn)
-            return open(route, "r")
+            return open(route, "rb")
         else:
             return None
 
@@ -1997,20 +2202,18 @@ class SWORDServer(object):
             # An identifier which will resolve to the package just deposited
             deposit_uri = self.um.part_uri(collection, id, fn)
 
-        # the aggregation uri
-        agg_uri = self.um.agg_uri(collection, id)
-
-        # the Edit-URI
-        edit_uri = self.um.edit_uri(collection, id)
+        # all the identifiers for the container, including the aggregation uri and the Edit-URI
+        uris = self.um.build_all(collection, id)
+        agg_uri = uris.agg
+        edit_uri = uris.edit
 
         # create the new statement
         s = Statement()
         s.aggregation_uri = agg_uri
         s.rem_uri = edit_uri
         if deposit_uri is not None:
-            by = deposit.auth.by if deposit.auth is not None else None
-            obo = deposit.auth.obo if deposit.auth is not None else None
-            s.original_deposit(deposit_uri, datetime.now(), deposit.packaging, by, obo)
+            by, obo = _auth_tuple(deposit.auth)
+            s.original_deposit(deposit_uri, datetime.utcnow(), deposit.packaging, by, obo)
         s.in_progress = deposit.in_progress
         s.aggregates = derived_resource_uris
 
@@ -2019,7 +2222,7 @@ class SWORDServer(object):
 
         # create the deposit receipt (which involves getting hold of the item's metadata first if it exists
         metadata = self.dao.get_metadata(collection, id)
-        receipt = self.deposit_receipt(collection, id, deposit, s, metadata)
+        receipt = self.deposit_receipt(collection, id, deposit, s, metadata, uris)
 
         # store the deposit receipt also
         self.dao.store_deposit_receipt(collection, id, receipt)
@@ -2061,11 +2264,10 @@ class SWORDServer(object):
         # container and not the media resource.
         self.dao.remove_content(collection, id, True)
 
-        # the aggregation uri
-        agg_uri = self.um.agg_uri(collection, id)
-
-        # the Edit-URI
-        edit_uri = self.um.edit_uri(collection, id)
+        # all the identifiers for the container, including the aggregation uri and the Edit-URI
+        uris = self.um.build_all(collection, id)
+        agg_uri = uris.agg
+        edit_uri = uris.edit
 
         # create the statement
         s = Statement()
@@ -2078,7 +2280,7 @@ class SWORDServer(object):
 
         # create the deposit receipt (which involves getting hold of the item's metadata first if it exists
         metadata = self.dao.get_metadata(collection, id)
-        receipt = self.deposit_receipt(collection, id, delete, s, metadata)
+        receipt = self.deposit_receipt(collection, id, delete, s, metadata, uris)
 
         # store the deposit receipt also
         self.dao.store_deposit_receipt(collection, id, receipt)
@@ -2109,6 +2311,9 @@ class SWORDServer(object):
         if not self.exists(oid):
             return None
 
+        # all the identifiers for the container
+        uris = self.um.build_all(collection, id)
+
         # load the statement
         s = self.dao.load_statement(collection, id)
         s.in_progress = deposit.in_progress
@@ -2130,9 +2335,8 @@ class SWORDServer(object):
             # An identifier which will resolve to the package just deposited
             deposit_uri = self.um.part_uri(collection, id, fn)
             
-            by = deposit.auth.by if deposit.auth is not None else None
-            obo = deposit.auth.obo if deposit.auth is not None else None
-            s.original_deposit(deposit_uri, datetime.now(), deposit.packaging, by, obo)
+            by, obo = _auth_tuple(deposit.auth)
+            s.original_deposit(deposit_uri, datetime.utcnow(), deposit.packaging, by, obo)
             
             # a list of identifiers which will resolve to the derived resources
             derived_resource_uris = self.get_derived_resource_uris(collection, id, derived_resources)
@@ -2142,14 +2346,14 @@ class SWORDServer(object):
             if deposit.packaging == "http://purl.org/net/sword/package/Binary":
                 location_uri = deposit_uri
             else:
-                location_uri = self.um.em_uri(collection, id)
+                location_uri = uris.em
         
         # store the statement by itself
         self.dao.store_statement(collection, id, s)
 
         # create the deposit receipt (which involves getting hold of the item's metadata first if it exists
         metadata = self.dao.get_metadata(collection, id)
-        receipt = self.deposit_receipt(collection, id, deposit, s, metadata)
+        receipt = self.deposit_receipt(collection, id, deposit, s, metadata, uris)
 
         # store the deposit receipt also
         self.dao.store_deposit_receipt(collection, id, receipt)
@@ -2213,6 +2417,9 @@ class SWORDServer(object):
         if not self.exists(oid):
             return None
 
+        # all the identifiers for the container
+        uris = self.um.build_all(collection, id)
+
         # load the statement
         s = self.dao.load_statement(collection, id)
         
@@ -2262,9 +2469,8 @@ class SWORDServer(object):
             deposit_uri = self.um.part_uri(collection, id, fn)
 
             # add the new deposit
-            by = deposit.auth.by if deposit.auth is not None else None
-            obo = deposit.auth.obo if deposit.auth is not None else None
-            s.original_deposit(deposit_uri, datetime.now(), deposit.packaging, by, obo)
+            by, obo = _auth_tuple(deposit.auth)
+            s.original_deposit(deposit_uri, datetime.utcnow(), deposit.packaging, by, obo)
         
         # add the new list of aggregations to the existing list, allowing the
         # statement to ensure that the list is normalised (only consisting of
@@ -2276,7 +2482,7 @@ class SWORDServer(object):
 
         # create the deposit receipt (which involves getting hold of the item's metadata first if it exists
         metadata = self.dao.get_metadata(collection, id)
-        receipt = self.deposit_receipt(collection, id, deposit, s, metadata)
+        receipt = self.deposit_receipt(collection, id, deposit, s, metadata, uris)
 
         # store the deposit receipt also
         self.dao.store_deposit_receipt(collection, id, receipt)
@@ -2292,7 +2498,7 @@ class SWORDServer(object):
         # in this case, we have always gone for the approach of 6.7.2, and contend that the
         # spec is INCORRECT for 6.7.3 (also, section 9.3, which comes into play here
         # also says use the edit-uri)
-        dr.location = self.um.edit_uri(collection, id) 
+        dr.location = uris.edit
         dr.created = True
         return dr
 
@@ -2328,20 +2534,20 @@ class SWORDServer(object):
     def augmented_receipt(self, receipt, original_deposit_uri, derived_resource_uris=[]):
         # Original Deposit
         if original_deposit_uri is not None:
-            od = etree.SubElement(receipt, self.ns.ATOM + "link")
+            od = etree.SubElement(receipt, self.ATOM_LINK)
             od.set("rel", "http://purl.org/net/sword/terms/originalDeposit")
             od.set("href", original_deposit_uri)
         
         # Derived Resources
         if derived_resource_uris is not None:
             for uri in derived_resource_uris:
-                dr = etree.SubElement(receipt, self.ns.ATOM + "link")
+                dr = etree.SubElement(receipt, self.ATOM_LINK)
                 dr.set("rel", "http://purl.org/net/sword/terms/derivedResource")
                 dr.set("href", uri)
             
-        return etree.tostring(receipt, pretty_print=True)
+        return etree.tostring(receipt, pretty_print=self.configuration.pretty_print)
 
-    def deposit_receipt(self, collection, id, deposit, statement, metadata):
+    def deposit_receipt(self, collection, id, deposit, statement, metadata, uris=None):
         """
         Construct a deposit receipt document for the provided URIs
         Args:
@@ -2350,134 +2556,193 @@ class SWORDServer(object):
         -em_uri:    The EM-URI (Edit Media) at which operations on the media resource can be conducted
         -edit_uri:  The Edit-URI at which operations on the container can be conducted
         -statement: A Statement object to be embedded in the receipt as foreign markup (deprecated)
+        -uris:  The ContainerURIs for the container, if the caller has already built them
         Returns a string representation of the deposit receipt
         """
         # assemble the URIs we are going to need
-        
+        if uris is None:
+            uris = self.um.build_all(collection, id)
+
         # the atom entry id
-        drid = self.um.atom_id(collection, id)
+        drid = uris.atom_id
 
         # the Cont-URI
-        cont_uri = self.um.cont_uri(collection, id)
+        cont_uri = uris.cont
 
         # the EM-URI and SE-IRI
-        em_uri = self.um.em_uri(collection, id)
+        em_uri = uris.em
 
         # the Edit-URI
-        edit_uri = self.um.edit_uri(collection, id)
+        edit_uri = uris.edit
         se_uri = edit_uri
 
         # the splash page URI
-        splash_uri = self.um.html_url(collection, id)
+        splash_uri = uris.html
 
         # the two statement uris
-        atom_statement_uri = self.um.state_uri(collection, id, "atom")
-        ore_statement_uri = self.um.state_uri(collection, id, "ore")
+        atom_statement_uri = uris.atom_statement
+        ore_statement_uri = uris.ore_statement
 
         # ensure that there is a metadata object, and that it is populated with enough information to build the
         # deposit receipt
-        if metadata is None:
-            metadata = {}
-        if not metadata.has_key("title"):
-            metadata["title"] = ["SWORD Deposit"]
-        if not metadata.has_key("creator"):
-            metadata["creator"] = ["SWORD Client"]
-        if not metadata.has_key("abstract"):
-            metadata["abstract"] = ["Content deposited with SWORD client"]
+        defaults = dict(self.receipt_metadata_defaults)
+        if metadata is not None:
+            defaults.update(metadata)
+        metadata = defaults
 
-        # Now assemble the deposit receipt
-
-        # the main entry document room
-        entry = etree.Element(self.ns.ATOM + "entry", nsmap=self.drmap)
+        # Now assemble the deposit receipt, starting from a copy of the pre-built one and filling in the parts which
+        # are particular to this item
+        template, slots = self._receipt_template()
+        entry = deepcopy(template)
 
         # Title from metadata
-        title = etree.SubElement(entry, self.ns.ATOM + "title")
-        title.text = metadata['title'][0]
+        entry[slots["title"]].text = metadata['title'][0]
 
         # Atom Entry ID
-        id = etree.SubElement(entry, self.ns.ATOM + "id")
-        id.text = drid
+        entry[slots["id"]].text = drid
 
         # Date last updated (i.e. NOW)
-        updated = etree.SubElement(entry, self.ns.ATOM + "updated")
-        updated.text = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
+        entry[slots["updated"]].text = _timestamp(datetime.utcnow())
 
         # Author field from metadata
-        author = etree.SubElement(entry, self.ns.ATOM + "author")
-        name = etree.SubElement(author, self.ns.ATOM + "name")
-        name.text = metadata['creator'][0]
+        entry[slots["author"]][0].text = metadata['creator'][0]
 
         # Summary field from metadata
-        summary = etree.SubElement(entry, self.ns.ATOM + "summary")
+        entry[slots["summary"]].text = metadata['abstract'][0]
+
+        # link to splash page
+        entry[slots["alternate"]].set("href", splash_uri)
+
+        # Media Resource Content URI (Cont-URI)
+        entry[slots["content"]].set("src", cont_uri)
+
+        # Edit-URI
+        entry[slots["edit"]].set("href", edit_uri)
+
+        # EM-URI (Media Resource)
+        entry[slots["edit_media"]].set("href", em_uri)
+        entry[slots["edit_media_feed"]].set("href", em_uri + ".atom")
+
+        # SE-URI (Sword edit - same as media resource)
+        entry[slots["add"]].set("href", se_uri)
+
+        # now the two statement uris
+        entry[slots["atom_statement"]].set("href", atom_statement_uri)
+        entry[slots["ore_statement"]].set("href", ore_statement_uri)
+
+        # now embed all the metadata as foreign markup, after the generator.  The elements are created at the end of
+        # the entry so that they pick up its namespace declarations, and then moved into place.  This has to come
+        # last, as it moves everything after the generator along
+        position = slots["metadata"]
+        dc = self.ns.DC
+        sub = etree.SubElement
+        insert = entry.insert
+        for field, values in metadata.iteritems():
+            for v in values:
+                fdc = sub(entry, dc + field)
+                fdc.text = v
+                insert(position, fdc)
+                position += 1
+
+        return entry
+
+    def _receipt_template(self):
+        """
+        Get the deposit receipt with everything which is the same for every item already in place, building and
+        caching it if necessary.  This is returned as an (entry, slots) pair, where slots gives the position in the
+        entry of each of the elements that deposit_receipt fills in
+        """
+        if self.receipt_template is None:
+            SWORDServer.receipt_template = self._build_receipt_template()
+        return self.receipt_template
+
+    def _build_receipt_template(self):
+        # the main entry document room
+        entry = etree.Element(self.ATOM_ENTRY, nsmap=self.drmap)
+
+        # Title, Atom Entry ID and date last updated; filled in for each receipt
+        title = etree.SubElement(entry, self.ATOM_TITLE)
+        id = etree.SubElement(entry, self.ATOM_ID)
+        updated = etree.SubElement(entry, self.ATOM_UPDATED)
+
+        # Author field; the name is filled in for each receipt
+        author = etree.SubElement(entry, self.ATOM_AUTHOR)
+        etree.SubElement(author, self.ATOM_NAME)
+
+        # Summary field; filled in for each receipt
+        summary = etree.SubElement(entry, self.ATOM_SUMMARY)
         summary.set("type", "text")
-        summary.text = metadata['abstract'][0]
 
-        
         # Generator - identifier for this server software
-        generator = etree.SubElement(entry, self.ns.ATOM + "generator")
+        generator = etree.SubElement(entry, self.ATOM_GENERATOR)
         generator.set("uri", "http://www.swordapp.org/sss")
         generator.set("version", "1.0")
 
-        # now embed all the metadata as foreign markup
-        for field in metadata.keys():
-            for v in metadata[field]:
-                fdc = etree.SubElement(entry, self.ns.DC + field)
-                fdc.text = v
+        # the metadata goes here, as foreign markup
 
         # verbose description
-        vd = etree.SubElement(entry, self.ns.SWORD + "verboseDescription")
+        vd = etree.SubElement(entry, self.SWORD_VERBOSE_DESCRIPTION)
         vd.text = "SSS has done this, that and the other to process the deposit"
 
         # treatment
-        treatment = etree.SubElement(entry, self.ns.SWORD + "treatment")
+        treatment = etree.SubElement(entry, self.SWORD_TREATMENT)
         treatment.text = "Treatment description"
 
         # link to splash page
-        alt = etree.SubElement(entry, self.ns.ATOM + "link")
+        alt = etree.SubElement(entry, self.ATOM_LINK)
         alt.set("rel", "alternate")
-        alt.set("href", splash_uri)
+        alt.set("href", "")
 
         # Media Resource Content URI (Cont-URI)
-        content = etree.SubElement(entry, self.ns.ATOM + "content")
+        content = etree.SubElement(entry, self.ATOM_CONTENT)
         content.set("type", "application/zip")
-        content.set("src", cont_uri)
+        content.set("src", "")
 
         # Edit-URI
-        editlink = etree.SubElement(entry, self.ns.ATOM + "link")
+        editlink = etree.SubElement(entry, self.ATOM_LINK)
         editlink.set("rel", "edit")
-        editlink.set("href", edit_uri)
-        
+        editlink.set("href", "")
+
         # EM-URI (Media Resource)
-        emlink = etree.SubElement(entry, self.ns.ATOM + "link")
+        emlink = etree.SubElement(entry, self.ATOM_LINK)
         emlink.set("rel", "edit-media")
-        emlink.set("href", em_uri)
-        emfeedlink = etree.SubElement(entry, self.ns.ATOM + "link")
+        emlink.set("href", "")
+        emfeedlink = etree.SubElement(entry, self.ATOM_LINK)
         emfeedlink.set("rel", "edit-media")
         emfeedlink.set("type", "application/atom+xml;type=feed")
-        emfeedlink.set("href", em_uri + ".atom")
+        emfeedlink.set("href", "")
 
         # SE-URI (Sword edit - same as media resource)
-        selink = etree.SubElement(entry, self.ns.ATOM + "link")
+        selink = etree.SubElement(entry, self.ATOM_LINK)
         selink.set("rel", "http://purl.org/net/sword/terms/add")
-        selink.set("href", se_uri)
+        selink.set("href", "")
 
         # supported packaging formats
         for disseminator in self.configuration.sword_disseminate_package:
-            sp = etree.SubElement(entry, self.ns.SWORD + "packaging")
+            sp = etree.SubElement(entry, self.SWORD_PACKAGING)
             sp.text = disseminator
 
         # now the two statement uris
-        state1 = etree.SubElement(entry, self.ns.ATOM + "link")
+        state1 = etree.SubElement(entry, self.ATOM_LINK)
         state1.set("rel", "http://purl.org/net/sword/terms/statement")
         state1.set("type", "application/atom+xml;type=feed")
-        state1.set("href", atom_statement_uri)
+        state1.set("href", "")
 
-        state2 = etree.SubElement(entry, self.ns.ATOM + "link")
+        state2 = etree.SubElement(entry, self.ATOM_LINK)
         state2.set("rel", "http://purl.org/net/sword/terms/statement")
         state2.set("type", "application/rdf+xml")
-        state2.set("href", ore_statement_uri)
+        state2.set("href", "")
 
-        return entry
+        # record where each of the elements which are filled in for each receipt is, along with where the metadata
+        # goes, so that deposit_receipt does not depend on the order in which they were built here
+        slots = {"metadata" : entry.index(generator) + 1}
+        for name, element in [("title", title), ("id", id), ("updated", updated), ("author", author),
+                              ("summary", summary), ("alternate", alt), ("content", content), ("edit", editlink),
+                              ("edit_media", emlink), ("edit_media_feed", emfeedlink), ("add", selink),
+                              ("atom_statement", state1), ("ore_statement", state2)]:
+            slots[name] = entry.index(element)
+
+        return entry, slots
 
     def get_statement(self, oid, content_type):
         collection, id = self.um.interpret_oid(oid)
@@ -2489,112 +2754,167 @@ class SWORDServer(object):
             return None
 
     def sword_error(self, uri, msg=None):
-        entry = etree.Element(self.ns.SWORD + "error", nsmap=self.emap)
-        entry.set("href", uri)
+        # look for a pre-built version of this error document first
+        key = (uri, msg)
+        template = self.error_templates.get(key)
+        if template is None:
+            template = self._build_sword_error(uri, msg)
+
+            # msg can come from the client (e.g. the On-Behalf-Of user) so don't let the cache grow without bound
+            if len(self.error_templates) >= self.error_templates_max:
+                self.error_templates.clear()
+            self.error_templates[key] = template
+
+        # Date last updated (i.e. NOW).  The marker is in atom:updated, which comes before anything which might
+        # contain client supplied text, so only the first occurrence is replaced
+        return template.replace(self.error_updated_marker, _timestamp(datetime.utcnow()), 1)
+
+    def _build_sword_error(self, uri, msg=None):
+        # the document is written straight out to a buffer an element at a time, rather than being built as a tree
+        # and then serialised
+        text = "Error Description: " + uri
+        if msg is not None:
+            text += " ; " + msg
 
-        author = etree.SubElement(entry, self.ns.ATOM + "author")
-        name = etree.SubElement(author, self.ns.ATOM + "name")
-        name.text = "SSS"
+        buf = io.BytesIO()
+        with etree.xmlfile(buf) as xf:
+            with xf.element(self.SWORD_ERROR, {"href" : uri}, nsmap=self.emap):
+                with xf.element(self.ATOM_AUTHOR):
+                    with xf.element(self.ATOM_NAME):
+                        xf.write("SSS")
 
-        title = etree.SubElement(entry, self.ns.ATOM + "title")
-        title.text = "ERROR: " + uri
+                with xf.element(self.ATOM_TITLE):
+                    xf.write("ERROR: " + uri)
 
-        # Date last updated (i.e. NOW)
-        updated = etree.SubElement(entry, self.ns.ATOM + "updated")
-        updated.text = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
+                # Date last updated; filled in by sword_error each time the document is used
+                with xf.element(self.ATOM_UPDATED):
+                    xf.write(self.error_updated_marker)
 
-        # Generator - identifier for this server software
-        generator = etree.SubElement(entry, self.ns.ATOM + "generator")
-        generator.set("uri", "http://www.swordapp.org/sss")
-        generator.set("version", "1.0")
+                # Generator - identifier for this server software
+                with xf.element(self.ATOM_GENERATOR, {"uri" : "http://www.swordapp.org/sss", "version" : "1.0"}):
+                    pass
 
-        # Summary field from metadata
-        summary = etree.SubElement(entry, self.ns.ATOM + "summary")
-        summary.set("type", "text")
-        text = "Error Description: " + uri
-        if msg is not None:
-            text += " ; " + msg
-        summary.text = text
+                # Summary field from metadata
+                with xf.element(self.ATOM_SUMMARY, {"type" : "text"}):
+                    xf.write(text)
 
-        # treatment
-        treatment = etree.SubElement(entry, self.ns.SWORD + "treatment")
-        treatment.text = "processing failed"
-        
-        # verbose description
-        vb = etree.SubElement(entry, self.ns.SWORD + "verboseDescription")
-        vb.text = "Verbose Description Here"
+                # treatment
+                with xf.element(self.SWORD_TREATMENT):
+                    xf.write("processing failed")
+
+                # verbose description
+                with xf.element(self.SWORD_VERBOSE_DESCRIPTION):
+                    xf.write("Verbose Description Here")
 
-        return etree.tostring(entry, pretty_print=True)
+        # xmlfile can't indent what it writes, so if we are pretty printing then re-serialise the document.  This is
+        # only done once for each cached error document, and the marker comes through untouched
+        if self.configuration.pretty_print:
+            return etree.tostring(etree.fromstring(buf.getvalue()), pretty_print=True)
+        return buf.getvalue()
+
+    def _error_response(self, uri, error_code, msg=None):
+        dr = DepositResponse()
+        dr.error = self.sword_error(uri, msg)
+        dr.error_code = error_code
+        return dr
+
+    def _mediation_error(self, auth):
+        # have we been asked to act on behalf of someone, when mediation is not allowed?
+        if auth is not None and auth.obo is not None and not self.configuration.mediation:
+            return self._error_response(_SPEC.error_mediation_not_allowed_uri, "412 Precondition Failed")
+        return None
 
     def check_delete_errors(self, delete):
         # have we been asked to do a mediated delete, when this is not allowed?
-        if delete.auth is not None:
-            if delete.auth.obo is not None and not self.configuration.mediation:
-                spec = SWORDSpec()
-                dr = DepositResponse()
-                error_doc = self.sword_error(spec.error_mediation_not_allowed_uri)
-                dr.error = error_doc
-                dr.error_code = "412 Precondition Failed"
-                return dr
-        return None
+        return self._mediation_error(delete.auth)
 
     def check_mediated_error(self, deposit):
         # have we been asked to do a mediated deposit, when this is not allowed?
-        if deposit.auth is not None:
-            if deposit.auth.obo is not None and not self.configuration.mediation:
-                spec = SWORDSpec()
-                dr = DepositResponse()
-                error_doc = self.sword_error(spec.error_mediation_not_allowed_uri)
-                dr.error = error_doc
-                dr.error_code = "412 Precondition Failed"
-                return dr
-        return None
+        return self._mediation_error(deposit.auth)
 
     def check_deposit_errors(self, deposit):
         # have we been asked for an invalid package format
         if deposit.packaging == self.configuration.error_content_package:
-            spec = SWORDSpec()
-            dr = DepositResponse()
-            error_doc = self.sword_error(spec.error_content_uri, "Unsupported Packaging format specified")
-            dr.error = error_doc
-            dr.error_code = "415 Unsupported Media Type"
-            return dr
-
-        # have we been given an incompatible MD5?
-        if deposit.content_md5 is not None:
-            m = hashlib.md5()
-            m.update(deposit.content)
-            digest = m.hexdigest()
-            if digest != deposit.content_md5:
-                spec = SWORDSpec()
-                dr = DepositResponse()
-                error_doc = self.sword_error(spec.error_checksum_mismatch_uri, "Content-MD5 header does not match file checksum")
-                dr.error = error_doc
-                dr.error_code = "412 Precondition Failed"
-                return dr
+            return self._error_response(_SPEC.error_content_uri, "415 Unsupported Media Type",
+                                        "Unsupported Packaging format specified")
 
-        # have we been asked to do a mediated deposit, when this is not allowed?
-        if deposit.auth is not None:
-            if deposit.auth.obo is not None and not self.configuration.mediation:
-                spec = SWORDSpec()
-                dr = DepositResponse()
-                error_doc = self.sword_error(spec.error_mediation_not_allowed_uri)
-                dr.error = error_doc
-                dr.error_code = "412 Precondition Failed"
-                return dr
+        # have we been given an incompatible MD5?  (there is nothing to check if the deposit has no content)
+        if deposit.content_md5 is not None and deposit.content is not None:
+            digest = hashlib.md5(deposit.content).hexdigest()
+            if not hmac.compare_digest(digest, deposit.content_md5):
+                return self._error_response(_SPEC.error_checksum_mismatch_uri, "412 Precondition Failed",
+                                            "Content-MD5 header does not match file checksum")
 
-        return None
+        # have we been asked to do a mediated deposit, when this is not allowed?
+        return self._mediation_error(deposit.auth)
 
 class Statement(object):
     """
     Class representing the Statement; a description of the object as it appears on the server
     """
+    __slots__ = ("aggregation_uri", "rem_uri", "original_deposits", "aggregates", "in_progress")
+
+    # URIs to use for the two supported states in SSS
+    in_progress_uri = "http://purl.org/net/sword/state/in-progress"
+    archived_uri = "http://purl.org/net/sword/state/archived"
+
+    # the descriptions to associated with the two supported states in SSS
+    states = {
+        in_progress_uri : "The work is currently in progress, and has not passed to a reviewer",
+        archived_uri : "The work has passed through review and is now in the archive"
+    }
+
+    # the (state uri, description) pair for each value of in_progress
+    state_terms = {
+        True : (in_progress_uri, states[in_progress_uri]),
+        False : (archived_uri, states[archived_uri])
+    }
+
+    # Namespace maps for XML serialisation
+    ns = Namespaces()
+    smap = {"rdf" : ns.RDF_NS, "ore" : ns.ORE_NS, "sword" : ns.SWORD_NS}
+    asmap = {"oreatom" : ns.ORE_ATOM_NS, "atom" : ns.ATOM_NS, "rdf" : ns.RDF_NS, "ore" : ns.ORE_NS, "sword" : ns.SWORD_NS}
+    fmap = {"atom" : ns.ATOM_NS, "sword" : ns.SWORD_NS}
+
+    # Clark notation names for the elements and attributes used in the serialisations, worked out once here rather
+    # than on every element
+    ATOM_CATEGORY = ns.ATOM + "category"
+    ATOM_CONTENT = ns.ATOM + "content"
+    ATOM_ENTRY = ns.ATOM + "entry"
+    ATOM_FEED = ns.ATOM + "feed"
+    ORE_AGGREGATES = ns.ORE + "aggregates"
+    ORE_DESCRIBES = ns.ORE + "describes"
+    ORE_IS_DESCRIBED_BY = ns.ORE + "isDescribedBy"
+    RDF_DESCRIPTION = ns.RDF + "Description"
+    RDF_RDF = ns.RDF + "RDF"
+    RDF_ABOUT = ns.RDF + "about"
+    RDF_DATATYPE = ns.RDF + "datatype"
+    RDF_RESOURCE = ns.RDF + "resource"
+    SWORD_DEPOSITED_BY = ns.SWORD + "depositedBy"
+    SWORD_DEPOSITED_ON = ns.SWORD + "depositedOn"
+    SWORD_DEPOSITED_ON_BEHALF_OF = ns.SWORD + "depositedOnBehalfOf"
+    SWORD_ORIGINAL_DEPOSIT = ns.SWORD + "originalDeposit"
+    SWORD_ORIGINAL_DEPOSIT_TERM = ns.SWORD_NS + "originalDeposit"
+    SWORD_PACKAGING = ns.SWORD + "packaging"
+    SWORD_STATE = ns.SWORD + "state"
+    SWORD_STATE_DESCRIPTION = ns.SWORD + "stateDescription"
+
+    # the attributes of the category which marks an entry in the Atom serialisation as an original deposit.  This is
+    # ordered, so that the attributes come out in the same order as they would if they were set one at a time
+    original_deposit_category = OrderedDict([
+        ("scheme", ns.SWORD_NS), ("term", SWORD_ORIGINAL_DEPOSIT_TERM), ("label", "Orignal Deposit")
+    ])
+
+    # the parts of the ORE serialisation which are the same for every statement, built on first use
+    rdf_template = None
+
     def __init__(self):
         """
         The statement has 4 important properties:
         - aggregation_uri   -   The URI of the aggregation in ORE terms
         - rem_uri           -   The URI of the Resource Map in ORE terms
-        - original_deposits -   The list of original packages uploaded to the server (set with original_deposit())
+        - original_deposits -   The list of original packages uploaded to the server (set with original_deposit()), as
+                                (uri, deposit time, packaging format, by, obo) tuples
         - in_progress       -   Is the submission in progress (boolean)
         - aggregates        -   the non-original deposit files associated with the item
         """
@@ -2604,22 +2924,6 @@ class Statement(object):
         self.aggregates = []
         self.in_progress = False
 
-        # URIs to use for the two supported states in SSS
-        self.in_progress_uri = "http://purl.org/net/sword/state/in-progress"
-        self.archived_uri = "http://purl.org/net/sword/state/archived"
-
-        # the descriptions to associated with the two supported states in SSS
-        self.states = {
-            self.in_progress_uri : "The work is currently in progress, and has not passed to a reviewer",
-            self.archived_uri : "The work has passed through review and is now in the archive"
-        }
-
-        # Namespace map for XML serialisation
-        self.ns = Namespaces()
-        self.smap = {"rdf" : self.ns.RDF_NS, "ore" : self.ns.ORE_NS, "sword" : self.ns.SWORD_NS}
-        self.asmap = {"oreatom" : self.ns.ORE_ATOM_NS, "atom" : self.ns.ATOM_NS, "rdf" : self.ns.RDF_NS, "ore" : self.ns.ORE_NS, "sword" : self.ns.SWORD_NS}
-        self.fmap = {"atom" : self.ns.ATOM_NS, "sword" : self.ns.SWORD_NS}
-
     def __str__(self):
         return str(self.aggregation_uri) + ", " + str(self.rem_uri) + ", " + str(self.original_deposits)
         
@@ -2630,7 +2934,11 @@ class Statement(object):
         - uri:  The URI to the original deposit
         - deposit_time:     When the deposit was originally made
         - packaging_format:     The package format of the deposit, as supplied in the Packaging header
+        - by:   The user who made the deposit
+        - obo:  The user the deposit was made on behalf of, or None
         """
+        # these are kept as plain tuples: the serialisers unpack them straight into locals, which is as cheap as
+        # reading a record gets
         self.original_deposits.append((uri, deposit_time, packaging_format, by, obo))
 
     def add_normalised_aggregations(self, aggs):
@@ -2642,179 +2950,191 @@ class Statement(object):
         """
         Populate this statement object from the XML serialised statement to be found at the specified filepath
         """
-        f = open(filepath, "r")
-        rdf = etree.fromstring(f.read())
-        
+        # read each rdf:Description as the parser finishes it and then throw it away, rather than holding the whole
+        # document
         aggs = []
-        ods = []
-        for desc in rdf.getchildren():
+        ods = set()
+        for event, desc in etree.iterparse(filepath, events=("end",), tag=self.RDF_DESCRIPTION):
             packaging = None
             depositedOn = None
             deposit_by = None
             deposit_obo = None
-            about = desc.get(self.ns.RDF + "about")
-            for element in desc.getchildren():
-                if element.tag == self.ns.ORE + "aggregates":
-                    resource = element.get(self.ns.RDF + "resource")
+            about = desc.get(self.RDF_ABOUT)
+            for element in desc:
+                if element.tag == self.ORE_AGGREGATES:
+                    resource = element.get(self.RDF_RESOURCE)
                     aggs.append(resource)
-                if element.tag == self.ns.ORE + "describes":
-                    resource = element.get(self.ns.RDF + "resource")
+                if element.tag == self.ORE_DESCRIBES:
+                    resource = element.get(self.RDF_RESOURCE)
                     self.aggregation_uri = resource
                     self.rem_uri = about
-                if element.tag == self.ns.SWORD + "state":
-                    state = element.get(self.ns.RDF + "resource")
-                    self.in_progress = state == "http://purl.org/net/sword/state/in-progress"
-                if element.tag == self.ns.SWORD + "packaging":
-                    packaging = element.get(self.ns.RDF + "resource")
-                if element.tag == self.ns.SWORD + "depositedOn":
+                if element.tag == self.SWORD_STATE:
+                    state = element.get(self.RDF_RESOURCE)
+                    self.in_progress = state == self.in_progress_uri
+                if element.tag == self.SWORD_PACKAGING:
+                    packaging = element.get(self.RDF_RESOURCE)
+                if element.tag == self.SWORD_DEPOSITED_ON:
                     deposited = element.text
                     depositedOn = datetime.strptime(deposited, "%Y-%m-%dT%H:%M:%SZ")
-                if element.tag == self.ns.SWORD + "depositedBy":
+                if element.tag == self.SWORD_DEPOSITED_BY:
                     deposit_by = element.text
-                if element.tag == self.ns.SWORD + "depositedOnBehalfOf":
+                if element.tag == self.SWORD_DEPOSITED_ON_BEHALF_OF:
                     deposit_obo = element.text
             if packaging is not None:
-                ods.append(about)
+                ods.add(about)
                 self.original_deposit(about, depositedOn, packaging, deposit_by, deposit_obo)
-        
+            desc.clear()
+
         # sort out the ordinary aggregations from the original deposits
         self.aggregates = []
         for agg in aggs:
             if agg not in ods:
                 self.aggregates.append(agg)
 
-    def serialise(self):
+    @property
+    def state(self):
+        """ The (state uri, state description) of the item """
+        return self.state_terms[bool(self.in_progress)]
+
+    def prepare(self):
+        """
+        Work out the parts of the statement which both serialisations need.  Pass the result to serialise() and
+        serialise_atom() when producing both, so that the work is only done once.
+        Returns a tuple of (state uri, state description, list of original deposits) where the original deposits are
+        (uri, formatted datestamp, packaging format, by, obo)
+        """
+        state_uri, state_description = self.state
+        deposits = [(uri, _timestamp(datestamp), format_uri, by, obo)
+                        for (uri, datestamp, format_uri, by, obo) in self.original_deposits]
+        return state_uri, state_description, deposits
+
+    def serialise(self, prepared=None):
         """
         Serialise this statement into an RDF/XML string
         """
-        rdf = self.get_rdf_xml()
-        return etree.tostring(rdf, pretty_print=True)
+        rdf = self.get_rdf_xml(prepared)
+        return etree.tostring(rdf, pretty_print=global_configuration.pretty_print)
 
-    def serialise_atom(self):
+    def serialise_atom(self, prepared=None):
         """
         Serialise this statement to an Atom Feed document
         """
+        state_uri, state_description, deposits = prepared if prepared is not None else self.prepare()
+
         # create the root atom feed element
-        feed = etree.Element(self.ns.ATOM + "feed", nsmap=self.fmap)
+        feed = etree.Element(self.ATOM_FEED, nsmap=self.fmap)
 
         # create the sword:state term in the root of the feed
-        state_uri = self.in_progress_uri if self.in_progress else self.archived_uri
-        state = etree.SubElement(feed, self.ns.SWORD + "state")
+        state = etree.SubElement(feed, self.SWORD_STATE)
         state.set("href", state_uri)
-        meaning = etree.SubElement(state, self.ns.SWORD + "stateDescription")
-        meaning.text = self.states[state_uri]
+        meaning = etree.SubElement(state, self.SWORD_STATE_DESCRIPTION)
+        meaning.text = state_description
+
+        # the loops below can run over many files, so look up the element factory once
+        sub = etree.SubElement
 
         # now do an entry for each original deposit
-        for (uri, datestamp, format_uri, by, obo) in self.original_deposits:
+        for (uri, datestamp, format_uri, by, obo) in deposits:
             # FIXME: this is not an official atom entry yet
-            entry = etree.SubElement(feed, self.ns.ATOM + "entry")
-
-            category = etree.SubElement(entry, self.ns.ATOM + "category")
-            category.set("scheme", self.ns.SWORD_NS)
-            category.set("term", self.ns.SWORD_NS + "originalDeposit")
-            category.set("label", "Orignal Deposit")
+            entry = sub(feed, self.ATOM_ENTRY)
+            sub(entry, self.ATOM_CATEGORY, self.original_deposit_category)
 
             # Media Resource Content URI (Cont-URI)
-            content = etree.SubElement(entry, self.ns.ATOM + "content")
+            content = sub(entry, self.ATOM_CONTENT)
             content.set("type", "application/zip")
             content.set("src", uri)
 
             # add all the foreign markup
 
-            format = etree.SubElement(entry, self.ns.SWORD + "packaging")
-            format.text = format_uri
-
-            deposited = etree.SubElement(entry, self.ns.SWORD + "depositedOn")
-            deposited.text = datestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-            deposit_by = etree.SubElement(entry, self.ns.SWORD + "depositedBy")
-            deposit_by.text = by
-
+            sub(entry, self.SWORD_PACKAGING).text = format_uri
+            sub(entry, self.SWORD_DEPOSITED_ON).text = datestamp
+            sub(entry, self.SWORD_DEPOSITED_BY).text = by
             if obo is not None:
-                deposit_obo = etree.SubElement(entry, self.ns.SWORD + "depositedOnBehalfOf")
-                deposit_obo.text = obo
+                sub(entry, self.SWORD_DEPOSITED_ON_BEHALF_OF).text = obo
 
         # finally do an entry for all the ordinary aggregated resources
         for uri in self.aggregates:
-            entry = etree.SubElement(feed, self.ns.ATOM + "entry")
-            content = etree.SubElement(entry, self.ns.ATOM + "content")
+            entry = sub(feed, self.ATOM_ENTRY)
+            content = sub(entry, self.ATOM_CONTENT)
             content.set("type", "application/octet-stream")
             content.set("src", uri)
 
-        return etree.tostring(feed, pretty_print=True)
+        return etree.tostring(feed, pretty_print=global_configuration.pretty_print)
 
-    def get_rdf_xml(self):
+    def get_rdf_xml(self, prepared=None):
         """
         Get an lxml Element object back representing this statement
         """
+        state_uri, state_description, deposits = prepared if prepared is not None else self.prepare()
 
         # we want to create an ORE resource map, and also add on the sword specific bits for the original deposits and the state
 
-        # create the RDF root
-        rdf = etree.Element(self.ns.RDF + "RDF", nsmap=self.smap)
+        # start from a copy of the RDF root with the Descriptions of the REM, the Aggregation and the state already in
+        # it, and fill in their URIs
+        if self.rdf_template is None:
+            Statement.rdf_template = self._build_rdf_template()
+        rdf = deepcopy(self.rdf_template)
+        description1, description, sdesc = rdf
+
+        # the Description for the REM which ore:describes the Aggregation
+        description1.set(self.RDF_ABOUT, self.rem_uri)
+        description1[0].set(self.RDF_RESOURCE, self.aggregation_uri)
 
-        # in the RDF root create a Description for the REM which ore:describes the Aggregation
-        description1 = etree.SubElement(rdf, self.ns.RDF + "Description")
-        description1.set(self.ns.RDF + "about", self.rem_uri)
-        describes = etree.SubElement(description1, self.ns.ORE + "describes")
-        describes.set(self.ns.RDF + "resource", self.aggregation_uri)
+        # the Description for the Aggregation which is ore:isDescribedBy the REM
+        description.set(self.RDF_ABOUT, self.aggregation_uri)
+        description[0].set(self.RDF_RESOURCE, self.rem_uri)
 
-        # in the RDF root create a Description for the Aggregation which is ore:isDescribedBy the REM
-        description = etree.SubElement(rdf, self.ns.RDF + "Description")
-        description.set(self.ns.RDF + "about", self.aggregation_uri)
-        idb = etree.SubElement(description, self.ns.ORE + "isDescribedBy")
-        idb.set(self.ns.RDF + "resource", self.rem_uri)
+        # the loops below can run over many files, so look up the element factory and attribute names once.  Each
+        # element in them has a single attribute, so it is passed straight to the factory
+        sub = etree.SubElement
+        about = self.RDF_ABOUT
+        resource = self.RDF_RESOURCE
+        datatype = self.RDF_DATATYPE
 
         # Create ore:aggreages for all ordinary aggregated files
         for uri in self.aggregates:
-            aggregates = etree.SubElement(description, self.ns.ORE + "aggregates")
-            aggregates.set(self.ns.RDF + "resource", uri)
+            sub(description, self.ORE_AGGREGATES, {resource : uri})
 
-        # Create ore:aggregates and sword:originalDeposit relations for the original deposits
-        for (uri, datestamp, format, by, obo) in self.original_deposits:
+        # Create ore:aggregates and sword:originalDeposit relations for the original deposits on the Aggregation, and
+        # build the Description elements for the original deposits themselves, with their sword:depositedOn and
+        # sword:packaging relations
+        for (uri, datestamp, format_uri, by, obo) in deposits:
             # standard ORE aggregates statement
-            aggregates = etree.SubElement(description, self.ns.ORE + "aggregates")
-            aggregates.set(self.ns.RDF + "resource", uri)
+            sub(description, self.ORE_AGGREGATES, {resource : uri})
 
             # assert that this is an original package
-            original = etree.SubElement(description, self.ns.SWORD + "originalDeposit")
-            original.set(self.ns.RDF + "resource", uri)
-
-        # now do the state information
-        state_uri = self.in_progress_uri if self.in_progress else self.archived_uri
-        state = etree.SubElement(description, self.ns.SWORD + "state")
-        state.set(self.ns.RDF + "resource", state_uri)
+            sub(description, self.SWORD_ORIGINAL_DEPOSIT, {resource : uri})
 
-        # Build the Description elements for the original deposits, with their sword:depositedOn and sword:packaging
-        # relations
-        for (uri, datestamp, format_uri, by, obo) in self.original_deposits:
-            desc = etree.SubElement(rdf, self.ns.RDF + "Description")
-            desc.set(self.ns.RDF + "about", uri)
+            desc = sub(rdf, self.RDF_DESCRIPTION, {about : uri})
+            sub(desc, self.SWORD_PACKAGING, {resource : format_uri})
+            sub(desc, self.SWORD_DEPOSITED_ON, {datatype : "http://www.w3.org/2001/XMLSchema#dateTime"}).text = datestamp
+            sub(desc, self.SWORD_DEPOSITED_BY, {datatype : "http://www.w3.org/2001/XMLSchema#string"}).text = by
+            if obo is not None:
+                sub(desc, self.SWORD_DEPOSITED_ON_BEHALF_OF, {datatype : "http://www.w3.org/2001/XMLSchema#string"}).text = obo
 
-            format = etree.SubElement(desc, self.ns.SWORD + "packaging")
-            format.set(self.ns.RDF + "resource", format_uri)
+        # now do the state information
+        sub(description, self.SWORD_STATE, {resource : state_uri})
 
-            deposited = etree.SubElement(desc, self.ns.SWORD + "depositedOn")
-            deposited.set(self.ns.RDF + "datatype", "http://www.w3.org/2001/XMLSchema#dateTime")
-            deposited.text = datestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
+        # finally the description for the state, which moves to the end of the document after the original deposits
+        sdesc.set(about, state_uri)
+        sdesc[0].text = state_description
+        rdf.append(sdesc)
 
-            deposit_by = etree.SubElement(desc, self.ns.SWORD + "depositedBy")
-            deposit_by.set(self.ns.RDF + "datatype", "http://www.w3.org/2001/XMLSchema#string")
-            deposit_by.text = by
+        return rdf
 
-            if obo is not None:
-                deposit_obo = etree.SubElement(desc, self.ns.SWORD + "depositedOnBehalfOf")
-                deposit_obo.set(self.ns.RDF + "datatype", "http://www.w3.org/2001/XMLSchema#string")
-                deposit_obo.text = obo
+    def _build_rdf_template(self):
+        rdf = etree.Element(self.RDF_RDF, nsmap=self.smap)
 
-        # finally do a description for the state
-        sdesc = etree.SubElement(rdf, self.ns.RDF + "Description")
-        sdesc.set(self.ns.RDF + "about", state_uri)
-        meaning = etree.SubElement(sdesc, self.ns.SWORD + "stateDescription")
-        meaning.text = self.states[state_uri]
+        # the Descriptions of the REM, the Aggregation and the state, in that order, each with their first child
+        etree.SubElement(etree.SubElement(rdf, self.RDF_DESCRIPTION), self.ORE_DESCRIBES)
+        etree.SubElement(etree.SubElement(rdf, self.RDF_DESCRIPTION), self.ORE_IS_DESCRIBED_BY)
+        etree.SubElement(etree.SubElement(rdf, self.RDF_DESCRIPTION), self.SWORD_STATE_DESCRIPTION)
 
         return rdf
 
+# All of the identifiers for a single container, as built by URIManager.build_all
+ContainerURIs = namedtuple("ContainerURIs", ["atom_id", "edit", "em", "cont", "agg", "html", "atom_statement", "ore_statement"])
+
 class URIManager(object):
     """
     Class for providing a single point of access to all identifiers used by SSS
@@ -2822,36 +3142,48 @@ class URIManager(object):
     def __init__(self):
         self.configuration = global_configuration
 
+        # the prefixes for each kind of URI, so that each call only has to append the container part
+        base = self.configuration.base_url
+        self.html_prefix = base + "html/"
+        self.sd_prefix = base + "sd-uri"
+        self.col_prefix = base + "col-uri/"
+        self.edit_prefix = base + "edit-uri/"
+        self.em_prefix = base + "em-uri/"
+        self.cont_prefix = base + "cont-uri/"
+        self.state_prefix = base + "state-uri/"
+        self.part_prefix = base + "part-uri/"
+        self.agg_prefix = base + "agg-uri/"
+
     def html_url(self, collection, id=None):
         """ The url for the HTML splash page of an object in the store """
         if id is not None:
-            return self.configuration.base_url + "html/" + collection + "/" + id
-        return self.configuration.base_url + "html/" + collection
+            return self.html_prefix + collection + "/" + id
+        return self.html_prefix + collection
 
     def sd_uri(self, sub=True):
-        uri = self.configuration.base_url + "sd-uri"
+        uri = self.sd_prefix
         if sub:
             uri += "/" + str(uuid.uuid4())
         return uri
 
     def col_uri(self, id):
         """ The url for a collection on the server """
-        return self.configuration.base_url + "col-uri/" + id
+        return self.col_prefix + id
 
     def edit_uri(self, collection, id):
         """ The Edit-URI """
-        return self.configuration.base_url + "edit-uri/" + collection + "/" + id
+        return self.edit_prefix + collection + "/" + id
 
     def em_uri(self, collection, id):
         """ The EM-URI """
-        return self.configuration.base_url + "em-uri/" + collection + "/" + id
+        return self.em_prefix + collection + "/" + id
 
     def cont_uri(self, collection, id):
         """ The Cont-URI """
-        return self.configuration.base_url + "cont-uri/" + collection + "/" + id
+        return self.cont_prefix + collection + "/" + id
 
     def state_uri(self, collection, id, type):
-        root = self.configuration.base_url + "state-uri/" + collection + "/" + id
+        root = self.state_prefix + collection + "/" + id
         if type == "atom":
             return root + ".atom"
         elif type == "ore":
@@ -2859,15 +3191,30 @@ class URIManager(object):
 
     def part_uri(self, collection, id, filename):
         """ The URL for accessing the parts of an object in the store """
-        return self.configuration.base_url + "part-uri/" + collection + "/" + id + "/" + urllib.quote(filename)
+        return self.part_prefix + collection + "/" + id + "/" + urllib.quote(filename)
 
     def agg_uri(self, collection, id):
-        return self.configuration.base_url + "agg-uri/" + collection + "/" + id
+        return self.agg_prefix + collection + "/" + id
 
     def atom_id(self, collection, id):
         """ An ID to use for Atom Entries """
         return "tag:container@sss/" + collection + "/" + id
 
+    def build_all(self, collection, id):
+        """
+        Build all of the identifiers for a container in one go, for the methods which need several of them.
+        Returns a ContainerURIs tuple
+        """
+        return ContainerURIs(
+            self.atom_id(collection, id),
+            self.edit_uri(collection, id),
+            self.em_uri(collection, id),
+            self.cont_uri(collection, id),
+            self.agg_uri(collection, id),
+            self.html_url(collection, id),
+            self.state_uri(collection, id, "atom"),
+            self.state_uri(collection, id, "ore"))
+
     def interpret_oid(self, oid):
         """
         Take an object id from a URL and interpret the collection and id terms.
@@ -2888,6 +3235,13 @@ class DAO(object):
     """
     Data Access Object for interacting with the store
     """
+    # the permissions a newly created store file gets.  The umask can only be read by setting it, so it is read once,
+    # here, rather than on every save
+    _umask = os.umask(0)
+    os.umask(_umask)
+    new_file_mode = 0666 & ~_umask
+    del _umask
+
     def __init__(self):
         """
         Initialise the DAO.  This creates the store directory in the Configuration() object if it does not already
@@ -2899,7 +3253,7 @@ class DAO(object):
         self.configuration = global_configuration
 
         # first thing to do is create the store if it does not already exist
-        print self.configuration.store_dir
+        ssslog.debug("Store directory: %s", self.configuration.store_dir)
         if not os.path.exists(self.configuration.store_dir):
             os.makedirs(self.configuration.store_dir)
 
@@ -2912,7 +3266,6 @@ class DAO(object):
             os.makedirs(cdir)
 
         self.ns = Namespaces()
-        self.mdmap = {None : self.ns.DC_NS}
 
     def get_collection_names(self):
         """ list all the collections in the store """
@@ -2961,24 +3314,62 @@ class DAO(object):
             os.makedirs(odir)
         return id
 
-    def save(self, filepath, content, opts="w"):
-        """
-        Shortcut to save the content to the filepath with the associated file handle opts (defaults to "w", so pass
-        in "wb" for binary files
-        """
-        f = open(filepath, opts)
-        f.write(content)
-        f.close()
+    def save(self, filepath, content, opts="wb"):
+        """
+        Shortcut to save the content to the filepath with the associated file handle opts.  The content must be a byte
+        string, and is written exactly as given: the XML serialisers all produce them, and store_atom encodes the
+        unicode atom of a multipart request before it gets here
+        """
+        # write to a temporary file alongside the real one and then move it into place, so that a failure part way
+        # through never leaves a truncated file in the store.  Each write gets its own uniquely named temporary file,
+        # so concurrent writes to the same file don't trip over each other, and the sss_ prefix keeps it out of
+        # content listings
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filepath), prefix="sss_tmp_")
+        try:
+            f = os.fdopen(fd, opts, 1 << 20)
+            try:
+                # mkstemp makes the file readable by its owner only, and the rename keeps that, so give it the
+                # permissions of the file it replaces, or those of a newly created file
+                if os.name != "nt":
+                    try:
+                        mode = os.stat(filepath).st_mode & 07777
+                    except OSError:
+                        mode = self.new_file_mode
+                    os.fchmod(f.fileno(), mode)
+                f.write(content)
+            finally:
+                f.close()
+
+            # rename replaces an existing file atomically everywhere except Windows, where it refuses to replace at all
+            if os.name == "nt" and os.path.exists(filepath):
+                os.remove(filepath)
+            os.rename(tmp, filepath)
+        except:
+            os.remove(tmp)
+            raise
+
+    def read(self, filepath):
+        """
+        Shortcut to read back the content of a stored file, as the byte string which was saved
+        """
+        f = open(filepath, "rb")
+        try:
+            return f.read()
+        finally:
+            f.close()
 
     def get_filename(self, filename):
         """
         Create a timestamped file name to avoid name clashes in the store
         """
-        return datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ") + "_" + filename
+        return _timestamp(datetime.utcnow()) + "_" + filename
 
     def store_atom(self, collection, id, atom):
         """ Store the supplied atom document content in the object identified by the id in the specified collection """
         afile = os.path.join(self.configuration.store_dir, collection, id, "atom.xml")
+        # the atom from a multipart request comes to us from web.py as unicode, but the store holds bytes
+        if isinstance(atom, unicode):
+            atom = atom.encode("utf-8")
         self.save(afile, atom)
 
     def store_content(self, collection, id, content, filename):
@@ -2989,51 +3380,68 @@ class DAO(object):
         """
         ufn = self.get_filename(filename)
         cfile = os.path.join(self.configuration.store_dir, collection, id, ufn)
-        self.save(cfile, content, "wb")
+        self.save(cfile, content)
         return ufn
 
+    # the statement and the deposit receipt are stored by separate calls, each writing by path: Python 2 has no openat
+    # or dir_fd to write them all against one open directory, and the store does not fsync, so there is nothing to
+    # batch by storing them together
     def store_statement(self, collection, id, statement):
         """ Store the supplied statement document content in the object idenfied by the id in the specified collection """
         # store the RDF version
+        prepared = statement.prepare()
         sfile = os.path.join(self.configuration.store_dir, collection, id, "sss_statement.xml")
-        self.save(sfile, statement.serialise())
+        self.save(sfile, statement.serialise(prepared))
         # store the Atom Feed version
         sfile = os.path.join(self.configuration.store_dir, collection, id, "sss_statement.atom.xml")
-        self.save(sfile, statement.serialise_atom())
+        self.save(sfile, statement.serialise_atom(prepared))
 
     def store_deposit_receipt(self, collection, id, receipt):
         """ Store the supplied receipt document content in the object idenfied by the id in the specified collection """
         drfile = os.path.join(self.configuration.store_dir, collection, id, "sss_deposit-receipt.xml")
         if not isinstance(receipt, str):
-            receipt = etree.tostring(receipt, pretty_print=True)
+            receipt = etree.tostring(receipt, pretty_print=self.configuration.pretty_print)
         self.save(drfile, receipt)
 
     def store_metadata(self, collection, id, metadata):
         """ Store the supplied metadata dictionary in the object idenfied by the id in the specified collection """
-        md = etree.Element(self.ns.DC + "metadata", nsmap=self.mdmap)
-        for dct in metadata.keys():
-            for v in metadata[dct]:
-                element = etree.SubElement(md, self.ns.DC + dct)
-                element.text = v
-        s = etree.tostring(md, pretty_print=True)
         mfile = os.path.join(self.configuration.store_dir, collection, id, "sss_metadata.xml")
+
+        # get_metadata reads a missing file as no metadata, so there is no need to write out an empty document; just
+        # make sure that nothing from an earlier deposit is left behind
+        if not metadata:
+            if os.path.exists(mfile):
+                os.remove(mfile)
+            return
+
+        # this is just a flat list of text elements, so write it out directly rather than building a tree.  The keys
+        # are always element names which have been read out of an XML document, so only the values need escaping
+        parts = ['<metadata xmlns="', self.ns.DC_NS, '">']
+        for dct, values in metadata.iteritems():
+            for v in values:
+                parts.append("<" + dct + ">" + escape(v) + "</" + dct + ">")
+        parts.append("</metadata>")
+        s = "".join(parts).encode("utf-8")
         self.save(mfile, s)
 
     def get_metadata(self, collection, id):
         if not self.file_exists(collection, id, "sss_metadata.xml"):
             return {}
         mfile = os.path.join(self.configuration.store_dir, collection, id, "sss_metadata.xml")
-        f = open(mfile, "r")
-        metadata = etree.fromstring(f.read())
+
+        # read each element as the parser finishes it and then throw it away, rather than holding the whole document
+        dc_ns = self.ns.DC
         md = {}
-        for dc in metadata.getchildren():
+        for event, dc in etree.iterparse(mfile, events=("end",)):
+            # we only want the children of the root metadata element
+            parent = dc.getparent()
+            if parent is None or parent.getparent() is not None:
+                continue
             tag = dc.tag
-            if tag.startswith(self.ns.DC):
-                tag = tag[len(self.ns.DC):]
-            if md.has_key(tag):
-                md[tag].append(dc.text.strip())
-            else:
-                md[tag] = [dc.text.strip()]
+            if tag.startswith(dc_ns):
+                tag = tag[len(dc_ns):]
+            md.setdefault(tag, []).append(dc.text.strip())
+            dc.clear()
         return md
 
     def remove_content(self, collection, id, keep_metadata=False, keep_atom=False):
@@ -3041,16 +3449,18 @@ class DAO(object):
         Remove all the content from the specified container.  If keep_metadata is True then the sss_metadata.xml
         file will not be removed
         """
+        # if there is a metadata.xml but metadata suppression on the deposit is turned on then leave it alone (and
+        # likewise the atom.xml)
+        keep = set()
+        if keep_metadata:
+            keep.add("sss_metadata.xml")
+        if keep_atom:
+            keep.add("atom.xml")
+
         odir = os.path.join(self.configuration.store_dir, collection, id)
         for file in os.listdir(odir):
-            # if there is a metadata.xml but metadata suppression on the deposit is turned on
-            # then leave it alone
-            if file == "sss_metadata.xml" and keep_metadata:
-                continue
-            if file == "atom.xml" and keep_atom:
-                continue
-            dpath = os.path.join(odir, file)
-            os.remove(dpath)
+            if file not in keep:
+                os.remove(os.path.join(odir, file))
 
     def remove_container(self, collection, id):
         """ Remove the specified container and all of its contents """
@@ -3078,25 +3488,21 @@ class DAO(object):
 
     def get_deposit_receipt_content(self, collection, id):
         """ Read the deposit receipt for the specified container """
-        f = open(self.get_store_path(collection, id, "sss_deposit-receipt.xml"), "r")
-        return f.read()
+        return self.read(self.get_store_path(collection, id, "sss_deposit-receipt.xml"))
 
     def get_statement_content(self, collection, id):
         """ Read the statement for the specified container """
-        f = open(self.get_store_path(collection, id, "sss_statement.xml"), "r")
-        return f.read()
+        return self.read(self.get_store_path(collection, id, "sss_statement.xml"))
 
     def get_statement_feed(self, collection, id):
         """ Read the statement for the specified container """
-        f = open(self.get_store_path(collection, id, "sss_statement.atom.xml"), "r")
-        return f.read()
+        return self.read(self.get_store_path(collection, id, "sss_statement.atom.xml"))
 
     def get_atom_content(self, collection, id):
         """ Read the statement for the specified container """
         if not self.file_exists(collection, id, "atom.xml"):
             return None
-        f = open(self.get_store_path(collection, id, "atom.xml"), "r")
-        return f.read()
+        return self.read(self.get_store_path(collection, id, "atom.xml"))
 
     def load_statement(self, collection, id):
         """
@@ -3114,10 +3520,9 @@ class DAO(object):
         exclude list.  This method will also not list sss specific files, thus limiting it to the content files of
         the object.
         """
-        cdir = os.path.join(self.configuration.store_dir, collection)
-        odir = os.path.join(cdir, id)
-        cfiles = [f for f in os.listdir(odir) if not f.startswith("sss_") and not f in exclude]
-        return cfiles
+        odir = os.path.join(self.configuration.store_dir, collection, id)
+        exclude = frozenset(exclude)
+        return [f for f in os.listdir(odir) if not f.startswith("sss_") and f not in exclude]
 
 # DISSEMINATION PACKAGING
 #######################################################################
@@ -3153,17 +3558,24 @@ class DefaultDisseminator(DisseminationPackager):
         # get a list of the relevant content files
         files = self.dao.list_content(collection, id, exclude=["sword-default-package.zip"])
 
-        # create a zip file with all the original zip files in it
+        # create a zip file with all the original zip files in it.  The contents are usually compressed already, so
+        # they are stored rather than deflated again
         zpath = self.dao.get_store_path(collection, id, "sword-default-package.zip")
-        z = ZipFile(zpath, "w")
-        for file in files:
-            z.write(self.dao.get_store_path(collection, id, file), file)
-        z.close()
+        with ZipFile(zpath, "w", ZIP_STORED, allowZip64=True) as z:
+            for file in files:
+                z.write(self.dao.get_store_path(collection, id, file), file)
 
         # return the path to the package to the caller
         return zpath
 
 class FeedDisseminator(DisseminationPackager):
+    # Clark notation names for the elements in the feed
+    _ns = Namespaces()
+    ATOM_FEED = _ns.ATOM + "feed"
+    ATOM_ENTRY = _ns.ATOM + "entry"
+    ATOM_LINK = _ns.ATOM + "link"
+    del _ns
+
     def __init__(self):
         self.dao = DAO()
         self.ns = Namespaces()
@@ -3176,33 +3588,86 @@ class FeedDisseminator(DisseminationPackager):
         files = self.dao.list_content(collection, id, exclude=["mediaresource.feed.xml"])
 
         # create a feed object with all the files as entries
-        feed = etree.Element(self.ns.ATOM + "feed", nsmap=self.nsmap)
+        feed = etree.Element(self.ATOM_FEED, nsmap=self.nsmap)
         
         for file in files:
-            entry = etree.SubElement(feed, self.ns.ATOM + "entry")
+            entry = etree.SubElement(feed, self.ATOM_ENTRY)
             
-            em = etree.SubElement(entry, self.ns.ATOM + "link")
+            em = etree.SubElement(entry, self.ATOM_LINK)
             em.set("rel", "edit-media")
             em.set("href", self.um.part_uri(collection, id, file))
             
-            edit = etree.SubElement(entry, self.ns.ATOM + "link")
+            edit = etree.SubElement(entry, self.ATOM_LINK)
             edit.set("rel", "edit")
             edit.set("href", self.um.part_uri(collection, id, file) + ".atom")
             
-            content = etree.SubElement(entry, self.ns.ATOM + "link")
+            content = etree.SubElement(entry, self.ATOM_LINK)
             content.set("type", "application/octet-stream") # FIXME: we're not storing content types, so we don't know
             content.set("src", self.um.part_uri(collection, id, file))
         
+        # let lxml serialise straight into the file, rather than building the whole document as a string first
         fpath = self.dao.get_store_path(collection, id, "mediaresource.feed.xml")
-        f = open(fpath, "wb")
-        f.write(etree.tostring(feed, pretty_print=True))
-        f.close()
+        etree.ElementTree(feed).write(fpath, pretty_print=global_configuration.pretty_print)
         
         return fpath
         
     def get_uri(self):
         return None
 
+# the atom elements which the ingesters take metadata from, with the dcterms key that each is stored under
+_ns = Namespaces()
+_ENTRY_ATOM_AUTHOR = _ns.ATOM + "author"
+_ENTRY_ATOM_KEYS = {
+    _ns.ATOM + "title" : "title",
+    _ns.ATOM + "updated" : "date",
+    _ENTRY_ATOM_AUTHOR : "creator",
+    _ns.ATOM + "summary" : "abstract"
+}
+_ENTRY_DC = _ns.DC
+del _ns
+
+def _extract_entry_metadata(atom, metadata):
+    """
+    Add the metadata in the serialised atom entry to the metadata dictionary.  The entry is parsed incrementally, and
+    each of its children is thrown away once it has been read, so the whole document is never held as a tree.  The
+    atom based metadata goes in before any of the dcterms, so that it comes first where they share a key
+    """
+    # we operate an additive policy with metadata.  Duplicate keys are allowed, but duplicate key/value pairs are not.
+    def a_insert(key, value):
+        values = metadata.get(key)
+        if values is None:
+            metadata[key] = [value]
+        elif value not in values:
+            values.append(value)
+
+    atom_keys = _ENTRY_ATOM_KEYS
+    dc = _ENTRY_DC
+    dc_len = len(dc)
+    dcterms = []
+
+    # the parser reads from a byte stream, but the atom from a multipart request comes to us from web.py as unicode
+    if isinstance(atom, unicode):
+        atom = atom.encode("utf-8")
+    for event, element in etree.iterparse(io.BytesIO(atom), events=("end",)):
+        # we only want the children of the root entry element; anything deeper is read along with its parent
+        parent = element.getparent()
+        if parent is None or parent.getparent() is not None:
+            continue
+
+        tag = element.tag
+        key = atom_keys.get(tag)
+        if key is not None:
+            if tag == _ENTRY_ATOM_AUTHOR:
+                a_insert(key, " ".join([names.text.strip() for names in element.getchildren()]).strip())
+            else:
+                a_insert(key, element.text.strip())
+        elif tag.startswith(dc):
+            dcterms.append((tag[dc_len:], element.text.strip()))
+        element.clear()
+
+    for key, value in dcterms:
+        a_insert(key, value)
+
 class IngestPackager(object):
     def ingest(self, collection, id, filename, metadata_relevant):
         """
@@ -3247,46 +3712,13 @@ class SimpleZipIngester(IngestPackager):
             return derived_resources
             
         metadata = {}
-        entry = etree.fromstring(atom)
 
         # go through each element in the atom entry and just process the ones we care about
-        # explicitly retrieve the atom based metadata first
-        for element in entry.getchildren():
-            if element.tag == self.ns.ATOM + "title":
-                self.a_insert(metadata, "title", element.text.strip())
-            if element.tag == self.ns.ATOM + "updated":
-                self.a_insert(metadata, "date", element.text.strip())
-            if element.tag == self.ns.ATOM + "author":
-                authors = ""
-                for names in element.getchildren():
-                    authors += names.text.strip() + " "
-                self.a_insert(metadata, "creator", authors.strip())
-            if element.tag == self.ns.ATOM + "summary":
-                self.a_insert(metadata, "abstract", element.text.strip())
-
-        # now go through and retrieve the dcterms from the entry
-        for element in entry.getchildren():
-            if not isinstance(element.tag, basestring):
-                continue
-                
-            # we operate an additive policy with metadata.  Duplicate
-            # keys are allowed, but duplicate key/value pairs are not.
-            if element.tag.startswith(self.ns.DC):
-                key = element.tag[len(self.ns.DC):]
-                val = element.text.strip()
-                self.a_insert(metadata, key, val)
+        _extract_entry_metadata(atom, metadata)
 
         self.dao.store_metadata(collection, id, metadata)
         
         return derived_resources
-        
-    def a_insert(self, d, key, value):
-        if d.has_key(key):
-            vs = d[key]
-            if value not in vs:
-                d[key].append(value)
-        else:
-            d[key] = [value]
 
 class METSDSpaceIngester(IngestPackager):
     def ingest(self, collection, id, filename, metadata_relevant):
@@ -3313,47 +3745,13 @@ class DefaultEntryIngester(object):
         
         ssslog.debug("Existing Metadata (before new ingest): " + str(metadata))
         
-        entry = etree.fromstring(atom)
-
         # go through each element in the atom entry and just process the ones we care about
-        # explicitly retrieve the atom based metadata first
-        for element in entry.getchildren():
-            if element.tag == self.ns.ATOM + "title":
-                self.a_insert(metadata, "title", element.text.strip())
-            if element.tag == self.ns.ATOM + "updated":
-                self.a_insert(metadata, "date", element.text.strip())
-            if element.tag == self.ns.ATOM + "author":
-                authors = ""
-                for names in element.getchildren():
-                    authors += names.text.strip() + " "
-                self.a_insert(metadata, "creator", authors.strip())
-            if element.tag == self.ns.ATOM + "summary":
-                self.a_insert(metadata, "abstract", element.text.strip())
-
-        # now go through and retrieve the dcterms from the entry
-        for element in entry.getchildren():
-            if not isinstance(element.tag, basestring):
-                continue
-                
-            # we operate an additive policy with metadata.  Duplicate
-            # keys are allowed, but duplicate key/value pairs are not.
-            if element.tag.startswith(self.ns.DC):
-                key = element.tag[len(self.ns.DC):]
-                val = element.text.strip()
-                self.a_insert(metadata, key, val)
+        _extract_entry_metadata(atom, metadata)
 
         ssslog.debug("Current Metadata (extracted + previously existing): " + str(metadata))
 
         self.dao.store_metadata(collection, id, metadata)
 
-    def a_insert(self, d, key, value):
-        if d.has_key(key):
-            vs = d[key]
-            if value not in vs:
-                d[key].append(value)
-        else:
-            d[key] = [value]
-
 # Basic Web Interface
 #######################################################################
 
@@ -3365,11 +3763,27 @@ class HomePage(WebPage):
     """
     Welcome / home page
     """
+
+    # the home page only changes if the set of collections does, so we keep the last rendered copy along with the
+    # collection names it was rendered from
+    cached_collections = None
+    cached_page = None
+
     def __init__(self):
         self.dao = DAO()
         self.um = URIManager()
         
     def get_home_page(self):
+        collections = self.dao.get_collection_names()
+        if collections == HomePage.cached_collections:
+            return HomePage.cached_page
+
+        page = self._render_home_page(collections)
+        HomePage.cached_collections = collections
+        HomePage.cached_page = page
+        return page
+
+    def _render_home_page(self, collections):
         cfg = global_configuration
         
         frag = "<h1>Simple SWORDv2 Server</h1>"
@@ -3379,7 +3793,7 @@ class HomePage(WebPage):
         
         # list the collections
         frag += "<h2>Collections</h2><ul>"
-        for col in self.dao.get_collection_names():
+        for col in collections:
             frag += "<li><a href=\"" + self.um.html_url(col) + "\">" + col + "</a></li>"
         frag += "</ul>"
         
@@ -3449,10 +3863,7 @@ class ItemPage(WebPage):
         return frag
     
     def _get_state_frag(self, statement):
-        if statement.in_progress:
-            return statement.in_progress_uri
-        else:
-            return statement.archived_uri
+        return statement.state[0]
     
     def _layout_sections(self, metadata, files):
         return "<table border=\"0\"><tr><td valign=\"top\">" + metadata + "</td><td valign=\"top\">" + files + "</td></tr></table>"
@@ -3464,6 +3875,21 @@ class ItemPage(WebPage):
 # create the global configuration
 global_configuration = CherryPyConfiguration()
 
+# the HTTP handlers check these flags on every request, but they are only set at startup, so take a copy of them
+# as module level names.  Call reload_config() if the global configuration is changed after this point
+def reload_config():
+    global ALLOW_UPDATE, ALLOW_DELETE, RETURN_DEPOSIT_RECEIPT
+    ALLOW_UPDATE = global_configuration.allow_update
+    ALLOW_DELETE = global_configuration.allow_delete
+    RETURN_DEPOSIT_RECEIPT = global_configuration.return_deposit_receipt
+
+    # the service document is built from the configuration too
+    SWORDServer.service_documents.clear()
+    SWORDServer.receipt_template = None
+    SWORDServer.error_templates.clear()
+
+reload_config()
+
 # get the global logger
 sssl = SSSLogger()
 ssslog = sssl.getLogger()
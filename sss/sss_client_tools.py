@@ -1,9 +1,11 @@
 import hashlib, uuid
 
-def md5_checksum(path):
-    f = open(path, "r")
+def md5_checksum(path, bufsize=1 << 20):
+    # read the file in binary mode and a block at a time, so that large packages are never held in memory whole
     m = hashlib.md5()
-    m.update(f.read())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(bufsize), ""):
+            m.update(block)
     digest = m.hexdigest()
     return digest
 
@@ -1,4 +1,4 @@
-import web, re, base64, urllib, uuid, os
+import web, re, base64, binascii, urllib, uuid, os
 from web.wsgiserver import CherryPyWSGIServer
 from core import Auth, SwordError, AuthException, DepositRequest, DeleteRequest
 from negotiator import ContentNegotiator, AcceptParameters, ContentType
@@ -361,8 +361,9 @@ class SwordHttpHandler(object):
             ssslog.info("Received multipart deposit request")
             d.atom = webin['atom']
             # FIXME: this reads the payload into memory, we need to sort that out
-            # read the zip file from the base64 encoded string
-            d.content = base64.decodestring(webin['payload'])
+            # read the zip file from the base64 encoded string.  a2b_base64 skips the line breaks in the encoded
+            # text itself, so there is no need to go through the base64 module's wrapper
+            d.content = binascii.a2b_base64(webin['payload'])
             is_multipart = True
         elif not empty_request:
             # if this wasn't a multipart, and isn't an empty request, then the data is in web.data().  This could be a binary deposit or
@@ -427,8 +428,9 @@ class SwordHttpHandler(object):
             ssslog.info("Received multipart deposit request")
             d.atom = webin['atom']
             # FIXME: this reads the payload into memory, we need to sort that out
-            # read the zip file from the base64 encoded string
-            d.content = base64.decodestring(webin['payload'])
+            # read the zip file from the base64 encoded string.  a2b_base64 skips the line breaks in the encoded
+            # text itself, so there is no need to go through the base64 module's wrapper
+            d.content = binascii.a2b_base64(webin['payload'])
             is_multipart = True
         elif not empty_request:
             # if this wasn't a multipart, and isn't an empty request, then the data is in web.data().  This could be a binary deposit or
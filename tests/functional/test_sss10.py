@@ -0,0 +1,280 @@
+import os, sys, re, imp, base64, hashlib, tempfile, logging
+
+import web
+
+from . import TestController
+
+RESOURCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources")
+SSS10 = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "sss", "sss-1.0.py")
+
+AUTH = {"HTTP_AUTHORIZATION" : "Basic " + base64.b64encode("sword:sword")}
+BOUNDARY = "===============0670350989=="
+
+# sss-1.0.py is a standalone script which sets up its store and logging configuration in the working directory when
+# it is loaded, so load it once, from a scratch directory, for all of the tests
+_sss = None
+def load_sss():
+    global _sss
+    if _sss is None:
+        cwd = os.getcwd()
+        argv = sys.argv
+        os.chdir(tempfile.mkdtemp())
+        sys.argv = ["sss-1.0.py"]
+        try:
+            _sss = imp.load_source("sss10", SSS10)
+        finally:
+            os.chdir(cwd)
+            sys.argv = argv
+        logging.getLogger().setLevel(logging.CRITICAL)
+    return _sss
+
+def wrap(text, width):
+    return "\n".join([text[i:i + width] for i in range(0, len(text), width)])
+
+def multipart(atom=None, payload=None):
+    parts = []
+    if atom is not None:
+        parts.append("Content-Type: application/atom+xml\nMIME-Version: 1.0\n" +
+                    "Content-Disposition: attachment; name=\"atom\"\n\n" + atom + "\n")
+    if payload is not None:
+        parts.append("Content-Type: application/zip\nMIME-Version: 1.0\n" +
+                    "Content-Disposition: attachment; name=\"payload\"; filename=\"example.zip\"\n" +
+                    "Content-Transfer-Encoding: base64\n\n" + payload + "\n")
+    return "".join(["--" + BOUNDARY + "\n" + part for part in parts]) + "--" + BOUNDARY + "--\n"
+
+class TestSSS10(TestController):
+
+    def setUp(self):
+        self.sss = load_sss()
+        self.app = web.application(self.sss.urls, vars(self.sss))
+        self.zip = open(os.path.join(RESOURCES, "example.zip"), "rb").read()
+        self.entry = open(os.path.join(RESOURCES, "entry.xml")).read()
+
+    def request(self, path, method="GET", data="", headers=None):
+        env = dict(AUTH)
+        env.update(headers or {})
+        if method not in ("GET", "HEAD"):
+            env["CONTENT_LENGTH"] = str(len(data))
+        # the handlers print the request to stdout
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        try:
+            return self.app.request(path, method=method, data=data, env=env)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    def collection(self):
+        sd = self.request("/sd-uri")
+        col = re.search(r'href="http://localhost:8080/(col-uri/[^"]+)"', sd.data).group(1)
+        return "/" + col
+
+    def container(self, location):
+        return location[location.index("/edit-uri/") + len("/edit-uri/"):]
+
+    def original_deposit(self, resp, filename="unnamed.file"):
+        """ the content of the file stored for the original deposit made by the request with the supplied response """
+        collection, id = self.container(resp.headers["Location"]).split("/")
+        dao = self.sss.DAO()
+        path = dao.get_store_path(collection, id)
+        # the stored name is prefixed with the time of deposit
+        names = [name for name in os.listdir(path) if name.endswith("_" + filename)]
+        assert len(names) == 1, os.listdir(path)
+        return dao.read(os.path.join(path, names[0]))
+
+    def post_binary(self, headers):
+        env = {
+            "CONTENT_TYPE" : "application/zip",
+            "HTTP_PACKAGING" : "http://purl.org/net/sword/package/Binary"
+        }
+        env.update(headers)
+        return self.request(self.collection(), "POST", self.zip, env)
+
+    def post_multipart(self, body):
+        return self.request(self.collection(), "POST", body, {
+            "CONTENT_TYPE" : 'multipart/related; boundary="%s"; type="application/atom+xml"' % BOUNDARY,
+            "HTTP_PACKAGING" : "http://purl.org/net/sword/package/SimpleZip"
+        })
+
+    def test_01_multipart_payload_any_wrap_width(self):
+        # 70 columns is not a multiple of 4, so a line by line decode would fail on the first line
+        resp = self.post_multipart(multipart(self.entry, wrap(base64.b64encode(self.zip), 70)))
+        assert resp.status.startswith("201"), resp.status
+        assert self.original_deposit(resp) == self.zip
+
+    def test_02_multipart_payload_block_boundaries(self):
+        # decode in blocks smaller than the payload, which do not fall on 4 character groups
+        spec = self.sss.SWORDSpec
+        size = spec.payload_block_size
+        spec.payload_block_size = 1001
+        try:
+            resp = self.post_multipart(multipart(self.entry, wrap(base64.b64encode(self.zip), 57)))
+        finally:
+            spec.payload_block_size = size
+        assert resp.status.startswith("201"), resp.status
+        assert self.original_deposit(resp) == self.zip
+
+    def test_03_multipart_without_payload(self):
+        resp = self.post_multipart(multipart(atom=self.entry))
+        assert resp.status.startswith("400"), resp.status
+        assert "Multipart request does not contain exactly 2 parts" in resp.data
+
+    def test_04_save_failure_leaves_no_temporary_file(self):
+        dao = self.sss.DAO()
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "sss_statement.xml")
+        dao.save(path, "original")
+        try:
+            # a non-ascii unicode string cannot be written to a binary file
+            dao.save(path, u"\u00e9")
+        except UnicodeEncodeError:
+            pass
+        else:
+            assert False, "expected the write to fail"
+        assert os.listdir(directory) == ["sss_statement.xml"]
+        assert dao.read(path) == "original"
+
+    def test_05_filename_must_start_a_parameter(self):
+        spec = self.sss.SWORDSpec()
+        assert spec.extract_filename("attachment; filename=example.zip") == "example.zip"
+        assert spec.extract_filename("filename=example.zip") == "example.zip"
+        assert spec.extract_filename("attachment; xfilename=other.zip") is None
+        assert spec.extract_filename("attachment; xfilename=other.zip; filename=example.zip") == "example.zip"
+
+    def test_06_filename_parameter_name_and_spacing(self):
+        spec = self.sss.SWORDSpec()
+        assert spec.extract_filename("attachment; FileName=example.zip") == "example.zip"
+        assert spec.extract_filename("attachment; filename = example.zip") == "example.zip"
+        assert spec.extract_filename("attachment;filename=example.zip;size=12") == "example.zip"
+
+    def test_07_quoted_filename(self):
+        spec = self.sss.SWORDSpec()
+        assert spec.extract_filename('attachment; filename="example.zip"') == "example.zip"
+        resp = self.post_binary({"HTTP_CONTENT_DISPOSITION" : 'attachment; filename="example.zip"'})
+        assert resp.status.startswith("201"), resp.status
+        assert self.original_deposit(resp, "example.zip") == self.zip
+
+    def test_08_no_filename(self):
+        spec = self.sss.SWORDSpec()
+        assert spec.extract_filename("attachment") is None
+        # without a filename the deposit keeps the default name
+        resp = self.post_binary({"HTTP_CONTENT_DISPOSITION" : "attachment"})
+        assert resp.status.startswith("201"), resp.status
+        assert self.original_deposit(resp) == self.zip
+
+    def test_09_accept_inferred_q_values(self):
+        cn = self.sss.ContentNegotiator()
+        analysed = cn.analyse_accept("text/html, application/zip;q=0.5, application/atom+xml")
+        # entries without a q value go in the gap above the highest explicit q, getting more of it the earlier they
+        # are listed: q_range / position on top of the highest q
+        assert [(q, ct.mimetype()) for q, ct in analysed] == [
+            (1.0, "text/html"), (0.5 + 0.5 / 3, "application/atom+xml"), (0.5, "application/zip")
+        ]
+
+    def test_10_accept_type_params_and_q(self):
+        cn = self.sss.ContentNegotiator()
+        analysed = cn.analyse_accept("application/atom+xml;type=feed;q=0.5, text/html")
+        assert [(q, ct.mimetype(), ct.params) for q, ct in analysed] == [
+            (0.75, "text/html", None), (0.5, "application/atom+xml;type=feed", "type=feed")
+        ]
+
+        # and so the client's preference for html sends it to the splash page, rather than failing
+        resp = self.post_binary({"HTTP_CONTENT_DISPOSITION" : "attachment; filename=example.zip"})
+        oid = self.container(resp.headers["Location"])
+        resp = self.request("/cont-uri/" + oid, headers={"HTTP_ACCEPT" : "application/atom+xml;type=feed;q=0.5, text/html"})
+        assert resp.status.startswith("302"), resp.status
+        assert resp.headers["Location"].endswith("/html/" + oid)
+
+    def test_11_content_md5_without_content(self):
+        ss = self.sss.SWORDServer()
+        d = self.sss.DepositRequest()
+        d.auth = self.sss.Auth("sword")
+        d.content_md5 = "0123456789abcdef0123456789abcdef"
+        # an empty deposit has nothing to check the checksum against, so it is not an error
+        assert d.content is None
+        assert ss.check_deposit_errors(d) is None
+
+        # but content which doesn't match the checksum is
+        d.content = self.zip
+        error = ss.check_deposit_errors(d)
+        assert error.error_code == "412 Precondition Failed"
+
+        d.content_md5 = hashlib.md5(self.zip).hexdigest()
+        assert ss.check_deposit_errors(d) is None
+
+    def test_12_empty_metadata_removes_metadata_file(self):
+        dao = self.sss.DAO()
+        collection = dao.get_collection_names()[0]
+        id = dao.create_container(collection)
+        dao.store_metadata(collection, id, {"title" : ["The Beach"], "creator" : ["Daffy"]})
+        assert dao.file_exists(collection, id, "sss_metadata.xml")
+        assert dao.get_metadata(collection, id) == {"title" : ["The Beach"], "creator" : ["Daffy"]}
+
+        # replacing it with no metadata leaves nothing behind, which reads back as no metadata
+        dao.store_metadata(collection, id, {})
+        assert not dao.file_exists(collection, id, "sss_metadata.xml")
+        assert dao.get_metadata(collection, id) == {}
+
+        # and storing no metadata where there never was any is fine too
+        dao.store_metadata(collection, id, {})
+        assert not dao.file_exists(collection, id, "sss_metadata.xml")
+
+    def test_13_error_document_follows_pretty_print(self):
+        config = self.sss.global_configuration
+        pretty_print = config.pretty_print
+        try:
+            for setting in (False, True):
+                config.pretty_print = setting
+                self.sss.reload_config()
+                error = self.sss.SWORDServer().sword_error("http://purl.org/net/sword/error/ErrorContent", "oops")
+                assert ("\n  <atom:title>" in error) == setting, error
+        finally:
+            config.pretty_print = pretty_print
+            self.sss.reload_config()
+
+    def test_14_service_document_follows_collections(self):
+        ss = self.sss.SWORDServer()
+        first = ss.service_document(True)
+        assert ss.service_document(True) == first
+
+        # a new collection in the store makes a new document, which lists it
+        dao = self.sss.DAO()
+        new_collection = "test-collection"
+        os.makedirs(dao.get_store_path(new_collection))
+        try:
+            second = ss.service_document(True)
+            assert second != first
+            assert 'href="http://localhost:8080/col-uri/test-collection"' in second
+            assert second.count("<collection ") == len(dao.get_collection_names())
+        finally:
+            os.rmdir(dao.get_store_path(new_collection))
+
+    def test_15_save_keeps_file_permissions(self):
+        dao = self.sss.DAO()
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "sss_statement.xml")
+
+        # a new file gets the permissions the umask allows, not the owner-only ones of the temporary file
+        dao.save(path, "original")
+        umask = os.umask(0)
+        os.umask(umask)
+        assert os.stat(path).st_mode & 0777 == 0666 & ~umask
+
+        # and an existing file keeps its permissions when it is replaced
+        for mode in (0644, 0640):
+            os.chmod(path, mode)
+            dao.save(path, "replaced")
+            assert os.stat(path).st_mode & 0777 == mode
+            assert dao.read(path) == "replaced"
+
+    def test_16_multipart_atom_with_non_ascii_text(self):
+        # web.py hands us the atom part of a multipart request as unicode, which must be stored as utf-8
+        entry = self.entry.replace("<title>The Beach</title>", "<title>Caf\xc3\xa9</title>")
+        assert entry != self.entry
+        resp = self.post_multipart(multipart(entry, base64.b64encode(self.zip)))
+        assert resp.status.startswith("201"), resp.status
+
+        collection, id = self.container(resp.headers["Location"]).split("/")
+        dao = self.sss.DAO()
+        assert dao.get_atom_content(collection, id) == entry
+        assert u"Caf\u00e9" in dao.get_metadata(collection, id)["title"]